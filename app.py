@@ -1,26 +1,33 @@
-import dash
-import geopandas as gpd
-import plotly.express as px
-import pandas as pd
-from dash import Dash, html, dcc, dash_table, Input, Output, State
-from fuzzywuzzy import process
+import hashlib
+import json
+import os
 from datetime import date
+from functools import lru_cache
+
+import dash
+import numpy as np
+import plotly.graph_objects as go
+from dash import Dash, html, dcc, dash_table, Input, Output, State, ClientsideFunction
+from dash.exceptions import PreventUpdate
+
+from cache import ResultCache
+from dataset import load_dataset
+from export import register_export_route
+from ingest import InventoryFollower, register_ingest_hook
+from maps import DEFAULT_TILES, FREQUENCY_COLORSCALE, MAP_COLORSCALE, MapFigures, MapLayer, register_tile_routes, view_tiles
+from metrics import instrument, register_metrics_route, stage
+from names import NAME_TABLE_PATH, build_name_resolver
+from rollup import CAUSE_NAMES, RegionTimeline, RollupCube
+from store import DISPLAY_COLUMNS, FloodStore, format_for_display
+
+# Inventory and shapefiles come from the binary cache in cache/data when it
+# matches the source files, so workers skip the CSV parser and geopandas
+inventory, layers, source_checksums, inventory_size = load_dataset()
+states_layer = layers['states']
+districts_layer = layers['districts']
 
-# Included the columns before reading the CSV file to reduce loading time
-columns_to_include = ['Start', 'End', 'Duration(Days)', 'Main Cause', 'State', 'Districts']
-df = pd.read_csv('src/IndiaFloodInventory.csv', usecols=columns_to_include)
-df = df.rename(columns={
-    'Start': 'Start Date',
-    'End': 'End Date',
-    'Duration(Days)': 'Duration (in days)',
-    'Cause': 'Main Cause',
-    'State': 'Affected State',
-    'Districts': 'Affected District',
-})
-
-# Convert dates to datetime and then format them to DD/MM/YYYY
-df['Start Date'] = pd.to_datetime(df['Start Date'], format='%d/%m/%Y').dt.strftime('%d/%m/%Y')
-df['End Date'] = pd.to_datetime(df['End Date'], format='%d/%m/%Y').dt.strftime('%d/%m/%Y')
+# Inventory held as typed columns, dates are only formatted when rows are rendered
+store = FloodStore(inventory)
 
 # State-district list of India
 districts_of_states = {
@@ -231,43 +238,83 @@ districts_of_states = {
     ]
 }
 
-districts_shapefile_path = "src/India_Districts.shp"
-states_shapefile_path = "src/india_states.shp"
-districts_gdf = gpd.read_file(districts_shapefile_path)
-states_gdf = gpd.read_file(states_shapefile_path)
+# Resolve every state/district spelling in the inventory once, not on every click
+name_resolver = build_name_resolver(store.frame, states_layer, districts_layer)
+# Dropdown districts are only matched against the districts of their state
+name_resolver.resolve_state_districts(districts_of_states)
+# Events located only by coordinates are matched to the district containing them
+store.index_regions(name_resolver, districts_layer.geometry)
+
+# Events appended with ingest.py are added to the store while running
+inventory_follower = InventoryFollower(store, name_resolver, inventory_size)
+
+# Query results, table pages and chart figures are memoised per process and
+# shared between workers, see cache.py. The version covers the source files
+# and name table as loaded plus the events ingested since, which every worker
+# following the CSV agrees on
+with open(NAME_TABLE_PATH, 'rb') as f:
+    dataset_fingerprint = hashlib.sha1(
+        json.dumps(source_checksums, sort_keys=True).encode('utf-8') + f.read()).hexdigest()[:16]
+result_cache = ResultCache(lambda: f'{dataset_fingerprint}-{len(store)}')
+
+# FLOOD_BACKGROUND=1 runs the map callback as a Dash background callback in
+# a process of its own (needs diskcache, multiprocess and psutil), so a slow
+# render never holds a request worker and a newer click cancels the job it
+# supersedes. Jobs go through cache/background, which every worker can poll.
+# Off by default: each job forks a process, which costs more than most renders
+BACKGROUND_CALLBACKS = os.environ.get('FLOOD_BACKGROUND') == '1'
+background_callback_manager = None
+if BACKGROUND_CALLBACKS:
+    import diskcache
+    from dash import DiskcacheManager
+
+    background_callback_manager = DiskcacheManager(diskcache.Cache('cache/background'))
 
 external_stylesheets = ['assets/custom.css']
-app = Dash(__name__, external_stylesheets=external_stylesheets)
-
-def create_default_map():
-    fig = px.choropleth_mapbox(
-        states_gdf,
-        geojson=states_gdf.geometry.__geo_interface__,
-        locations=states_gdf.index,
-        color_discrete_map={},
-        mapbox_style="carto-positron",
-        center={"lat": 22.5937, "lon": 78.9629},
-        zoom=3.3,
-        opacity=0.6
-    )
-    fig.update_layout(margin={"r": 0, "t": 0, "l": 0, "b": 0})
-    return fig
+app = Dash(__name__, external_stylesheets=external_stylesheets,
+           background_callback_manager=background_callback_manager)
+
+# WSGI entry point for gunicorn, see gunicorn.conf.py
+server = app.server
+
+# Layers are served as GeoJSON tiles, figures are cached per selection and viewport
+map_layers = [
+    MapLayer('state', states_layer, 'ST_NM'),
+    MapLayer('district', districts_layer, 'Dist_Name'),
+]
+register_tile_routes(server, map_layers)
+register_metrics_route(server)
+register_ingest_hook(server, inventory_follower)
+map_figures = MapFigures(map_layers)
 
-default_map_fig = create_default_map()
+# The default view's tiles and base figure are built before the first request,
+# in the gunicorn master when preloading, so workers share them
+for layer in map_layers:
+    for tile in DEFAULT_TILES:
+        layer.tile(*tile)
+default_map_fig = map_figures.figure('state')
 
 navbar = html.Div(
     html.Div("FLOOD DATA VISUALISER", className="navbar-brand"),
     className="navbar"
 )
 
-def create_data_table(dataframe):
+PAGE_SIZE = 50
+
+# Paging and sorting are done by update_table_page, the browser only ever holds one page
+def create_data_table():
     return dash_table.DataTable(
         id='datatable-interactivity',
-        data=dataframe.to_dict('records'), 
-        columns=[{"name": i, "id": i, "selectable": True} for i in dataframe.columns],
-        row_selectable="single",
+        data=[],
+        columns=[{"name": i, "id": i, "selectable": True} for i in DISPLAY_COLUMNS],
+        row_selectable="multi",
         selected_rows=[],
-        page_size=50,
+        page_action='custom',
+        page_current=0,
+        page_size=PAGE_SIZE,
+        sort_action='custom',
+        sort_mode='single',
+        sort_by=[],
         fixed_rows={'headers': True},
         style_table={'height': '500px', 'overflowY': 'auto'},
         style_header={
@@ -302,12 +349,7 @@ def create_data_table(dataframe):
             'textOverflow': 'ellipsis',
             'maxWidth': 0,
         },
-        tooltip_data=[
-            {
-                column: {'value': str(value), 'type': 'markdown'}
-                for column, value in row.items()
-            } for row in dataframe.to_dict('records')
-        ],
+        tooltip_data=[],
         tooltip_delay=5,
         tooltip_duration=None,
         style_cell_conditional=[
@@ -322,7 +364,37 @@ def create_data_table(dataframe):
         ]
     )
 
-app.layout = html.Div([
+@lru_cache(maxsize=1)
+def region_index(version):
+    # Event -> region ids for both layers, so row clicks recolour the map in the browser
+    return {
+        'state': store.event_states.to_json(),
+        'district': store.event_districts.to_json(),
+    }
+
+region_index_store = dcc.Store(id='region-index', data=region_index(store.version))
+
+@lru_cache(maxsize=1)
+def region_timeline(version):
+    # Years x regions activity for timeline playback, rebuilt after an ingest
+    return RegionTimeline.from_store(store)
+
+TIMELINE_STEP_MS = 800
+
+def create_timeline_slider(timeline):
+    return dcc.Slider(
+        id='timeline-year',
+        min=timeline.first_year,
+        max=timeline.last_year,
+        step=1,
+        value=timeline.first_year,
+        marks={year: str(year) for year in range(timeline.first_year, timeline.last_year + 1) if year % 10 == 0},
+        tooltip={'placement': 'bottom'},
+    )
+
+timeline_slider = html.Div(create_timeline_slider(region_timeline(store.version)), className='timeline-slider')
+
+layout = html.Div([
     navbar,
     html.Div([
         html.Div([
@@ -373,11 +445,18 @@ app.layout = html.Div([
                     ], className="form-inline"),
                     html.Div([
                         html.Button('Submit', id='submit-button', n_clicks=0, className="filter-button"),
+                        # Streams the submitted filter's rows from /export.csv
+                        html.A(
+                            html.Button('Export CSV', n_clicks=0, className="filter-button"),
+                            id='export-link', href='/export.csv', download='flood_events.csv',
+                        ),
                         html.Button('Reset Filters', id='reset-button', n_clicks=0, className="filter-button"),
                         html.Button('Delete All Filters', id='reset-all-button', n_clicks=0, className="filter-button"),
                     ], className="form-buttons"),
                 ], className='filter-box'),
-                html.Div(id='datatable-container', className='datatable-container', children=create_data_table(df)),
+                dcc.Store(id='table-query', data={}),
+                dcc.Store(id='districts-of-states', data=districts_of_states),
+                html.Div(id='datatable-container', className='datatable-container', children=create_data_table()),
             ], className='horizontal-flex'),
         ], className='table-box'),
         html.Div([
@@ -386,19 +465,106 @@ app.layout = html.Div([
                     id='highlight-option',
                     options=[
                         {'label': 'Show States', 'value': 'state'},
-                        {'label': 'Show Districts', 'value': 'district'}
+                        {'label': 'Show Districts', 'value': 'district'},
+                        {'label': 'Show Event Points', 'value': 'point'}
                     ],
                     value='state',
                     labelStyle={'display': 'inline-block'}
-                )], className='radio-buttons'),
+                ),
+                # Flood frequency: shade every region by a total over the filtered events
+                dcc.RadioItems(
+                    id='color-option',
+                    options=[
+                        {'label': 'Selected Event', 'value': 'event'},
+                        {'label': 'Flood Frequency', 'value': 'count'},
+                        {'label': 'Total Duration', 'value': 'duration'},
+                        {'label': 'Human Fatalities', 'value': 'fatalities'},
+                        {'label': 'Timeline', 'value': 'timeline'}
+                    ],
+                    value='event',
+                    labelStyle={'display': 'inline-block'}
+                ),
+                # Colours the regions of every event matching the filter, not just the selected rows
+                dcc.Checklist(
+                    id='select-all',
+                    options=[{'label': 'Select All Filtered', 'value': 'all'}],
+                    value=[],
+                    labelStyle={'display': 'inline-block'}
+                ),
+                # Timeline: regions with an event going on in the chosen year
+                html.Div([
+                    html.Button('Play', id='timeline-play', n_clicks=0, className="filter-button"),
+                    timeline_slider,
+                    dcc.Interval(id='timeline-interval', interval=TIMELINE_STEP_MS, disabled=True),
+                    dcc.Store(id='timeline-shown'),
+                ], className='timeline-controls'),
+                ], className='radio-buttons'),
             html.Div(className="map-container"),
-            dcc.Graph(id='map-graph', figure=default_map_fig)
+            dcc.Store(id='map-tiles', data=DEFAULT_TILES),
+            region_index_store,
+            # Shown while the map callback runs
+            html.Div(id='map-status', className='map-status'),
+            dcc.Graph(id='map-graph', figure=default_map_fig),
+            html.Div([
+                html.P("Flood Trends", className='box-header'),
+                html.Div([
+                    dcc.RadioItems(
+                        id='trend-measure',
+                        options=[
+                            {'label': 'Events', 'value': 'count'},
+                            {'label': 'Total Duration', 'value': 'duration'},
+                            {'label': 'Human Fatalities', 'value': 'fatalities'}
+                        ],
+                        value='count',
+                        labelStyle={'display': 'inline-block'}
+                    ),
+                    dcc.RadioItems(
+                        id='trend-period',
+                        options=[
+                            {'label': 'Yearly', 'value': 'year'},
+                            {'label': 'Monthly', 'value': 'month'}
+                        ],
+                        value='year',
+                        labelStyle={'display': 'inline-block'}
+                    )], className='radio-buttons'),
+                dcc.Graph(id='trend-graph'),
+            ], className='trend-box'),
         ], className='map-box'),
     ], className='container')
 ], className='content')
 
+@lru_cache(maxsize=1)
+def rollup_cube(version):
+    # Trend chart totals of all events, rebuilt after an ingest
+    return RollupCube.from_store(store)
+
+# Served through a function, so pages opened after an ingest get the new events' regions
+def serve_layout():
+    region_index_store.data = region_index(store.version)
+    timeline_slider.children = create_timeline_slider(region_timeline(store.version))
+    return layout
+
+app.layout = serve_layout
+
+@result_cache.memoize('query_event_ids')
+def query_event_ids(query):
+    # Sorted ids of the events matching a table-query filter
+    selected_state = query.get('state')
+    selected_district = query.get('district')
+    state_rows = name_resolver.resolve_state(selected_state) if selected_state else None
+    district_rows = None
+    if selected_district:
+        if state_rows is None:
+            district_rows = name_resolver.resolve_district(selected_district)
+        else:
+            district_rows = name_resolver.districts_within(selected_district, state_rows)
+    return store.query(query.get('start_date'), query.get('end_date'), state_rows, district_rows, query.get('cluster'))
+
+register_export_route(server, store, query_event_ids)
+
 @app.callback(
-    Output('datatable-container', 'children'),
+    Output('table-query', 'data'),
+    Output('datatable-interactivity', 'page_current'),
     Output('start-date', 'date'),
     Output('end-date', 'date'),
     Output('state', 'value'),
@@ -406,117 +572,297 @@ app.layout = html.Div([
     Input('submit-button', 'n_clicks'),
     Input('reset-button', 'n_clicks'),
     Input('reset-all-button', 'n_clicks'),
+    Input('map-graph', 'clickData'),
     State('start-date', 'date'),
     State('end-date', 'date'),
     State('state', 'value'),
     State('district', 'value')
 )
-def update_data_table(submit_n_clicks, reset_n_clicks, reset_all_n_clicks, start_date, end_date, selected_state, selected_district):
+@instrument('update_data_table')
+def update_data_table(submit_n_clicks, reset_n_clicks, reset_all_n_clicks, click_data, start_date, end_date, selected_state, selected_district):
     ctx = dash.callback_context
     if not ctx.triggered:
-        return create_data_table(df), None, None, None, None
+        return {}, 0, None, None, None, None
 
     button_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
     if button_id == 'reset-all-button' or button_id == 'reset-button':
-        return create_data_table(df), None, None, None, None
+        return {}, 0, None, None, None, None
 
-    filtered_df = df.copy()
+    query = {}
     if button_id == 'submit-button':
-        if start_date:
-            start_date = pd.to_datetime(start_date, format='%Y-%m-%d').strftime('%d/%m/%Y')
-            filtered_df = filtered_df[filtered_df['Start Date'] >= start_date]
-        if end_date:
-            end_date = pd.to_datetime(end_date, format='%Y-%m-%d').strftime('%d/%m/%Y')
-            filtered_df = filtered_df[filtered_df['End Date'] <= end_date]
-        if selected_state:
-            filtered_df = filtered_df[filtered_df['Affected State'].str.contains(selected_state, na=False)]
-        if selected_district:
-            filtered_df = filtered_df[filtered_df['Affected District'].str.contains(selected_district, na=False)]
-
-    return create_data_table(filtered_df), start_date, end_date, selected_state, selected_district
+        query = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'state': selected_state,
+            'district': selected_district,
+        }
+
+    # Clicking a point cluster narrows the filter to the events in it
+    if button_id == 'map-graph':
+        points = (click_data or {}).get('points') or [{}]
+        cluster = points[0].get('customdata')
+        if not isinstance(cluster, list):
+            raise PreventUpdate
+        query = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'state': selected_state,
+            'district': selected_district,
+            'cluster': cluster,
+        }
+
+    return query, 0, start_date, end_date, selected_state, selected_district
 
 @app.callback(
+    Output('datatable-interactivity', 'data'),
+    Output('datatable-interactivity', 'tooltip_data'),
+    Output('datatable-interactivity', 'page_count'),
+    Output('datatable-interactivity', 'selected_rows'),
+    Input('table-query', 'data'),
+    Input('datatable-interactivity', 'page_current'),
+    Input('datatable-interactivity', 'page_size'),
+    Input('datatable-interactivity', 'sort_by')
+)
+@instrument('update_table_page')
+@result_cache.memoize('update_table_page')
+def update_table_page(query, page_current, page_size, sort_by):
+    with stage('query'):
+        ids = query_event_ids(query or {})
+    if sort_by:
+        with stage('sort'):
+            ids = store.sort(ids, sort_by[0]['column_id'], sort_by[0]['direction'] == 'asc')
+
+    with stage('render_rows'):
+        page_ids = store.page_ids(ids, page_current or 0, page_size)
+        records = format_for_display(store.frame.iloc[page_ids]).to_dict('records')
+        tooltip_data = [
+            {
+                column: {'value': str(value), 'type': 'markdown'}
+                for column, value in row.items()
+            } for row in records
+        ]
+        # The DataTable row id is the event id, which the map highlights by
+        for row, event_id in zip(records, page_ids.tolist()):
+            row['id'] = event_id
+    page_count = max(1, -(-len(ids) // page_size))
+
+    # Row selection is per page, so a new page starts unselected
+    return records, tooltip_data, page_count, []
+
+# The district dropdown, export link and row highlighting run in the browser, see assets/clientside.js
+app.clientside_callback(
+    ClientsideFunction(namespace='flood', function_name='districtOptions'),
     Output('district', 'options'),
-    Input('state', 'value')
+    Input('state', 'value'),
+    State('districts-of-states', 'data')
+)
+
+app.clientside_callback(
+    ClientsideFunction(namespace='flood', function_name='exportHref'),
+    Output('export-link', 'href'),
+    Input('table-query', 'data'),
+    Input('datatable-interactivity', 'sort_by')
+)
+
+app.clientside_callback(
+    ClientsideFunction(namespace='flood', function_name='highlightRegions'),
+    Output('map-graph', 'figure', allow_duplicate=True),
+    Input('datatable-interactivity', 'derived_virtual_selected_row_ids'),
+    State('color-option', 'value'),
+    State('select-all', 'value'),
+    State('region-index', 'data'),
+    State('map-graph', 'figure'),
+    prevent_initial_call=True
 )
-def set_district_options(selected_state):
-    if selected_state is None:
-        return []
-    return [{'label': district, 'value': district} for district in districts_of_states[selected_state]]
+
+def event_regions(event_id):
+    # Precomputed region ids of one event in each layer
+    return {
+        'state': store.event_states.row(event_id),
+        'district': store.event_districts.row(event_id),
+    }
+
+def selection_colours(query, select_all, selected_ids):
+    # (highlighted, totals) of the selected events: a single event's regions
+    # are highlighted, several are counted per region by a bincount over the
+    # incidence. Select all takes every event matching the filter
+    if select_all:
+        return None, query_region_totals(query or {}, 'count')
+    if not selected_ids:
+        return {}, None
+    if len(selected_ids) == 1:
+        return event_regions(selected_ids[0]), None
+    return None, store.region_totals(np.asarray(selected_ids, dtype=np.int64), 'count')
+
+@result_cache.memoize('query_clusters')
+def query_clusters(query, zoom):
+    # Point clusters of the filtered events at a zoom level
+    return store.points.clusters(zoom, query_event_ids(query))
+
+@result_cache.memoize('query_region_totals')
+def query_region_totals(query, measure):
+    return store.region_totals(query_event_ids(query), measure)
+
+def timeline_regions(year):
+    # Region ids with an event going on in a year, in each layer
+    return {layer: np.flatnonzero(active) for layer, active in region_timeline(store.version).regions(year).items()}
 
 @app.callback(
     Output('map-graph', 'figure'),
-    Input('datatable-interactivity', 'derived_virtual_selected_rows'),
+    Output('map-tiles', 'data'),
+    Output('timeline-shown', 'data'),
     Input('highlight-option', 'value'),
-    State('datatable-interactivity', 'data')
+    Input('color-option', 'value'),
+    Input('table-query', 'data'),
+    Input('map-graph', 'relayoutData'),
+    Input('select-all', 'value'),
+    State('datatable-interactivity', 'derived_virtual_selected_row_ids'),
+    State('timeline-year', 'value'),
+    State('map-tiles', 'data'),
+    background=BACKGROUND_CALLBACKS,
+    running=[(Output('map-status', 'children'), 'Rendering map...', '')]
 )
-def update_datatable_interactivity(selected_rows, highlight_option, table_data):
-    if highlight_option == 'state':
-        default_gdf = states_gdf
-        hover_name_col = 'ST_NM'
-    else:
-        default_gdf = districts_gdf
-        hover_name_col = 'Dist_Name'
-
-    if selected_rows is None or len(selected_rows) == 0:
-        fig = px.choropleth_mapbox(
-            default_gdf,
-            geojson=default_gdf.geometry.__geo_interface__,
-            locations=default_gdf.index,
-            hover_name=hover_name_col,
-            color_continuous_scale=['lightgrey', 'red'],
-            mapbox_style="carto-positron",
-            center={"lat": 22.5937, "lon": 78.9629},
-            zoom=3.3,
-            opacity=0.6
-        )
+@instrument('update_datatable_interactivity')
+def update_datatable_interactivity(highlight_option, color_option, query, relayout_data, select_all, selected_ids, timeline_year, current_tiles):
+    # The figure holds both layers for the visible tiles. Switching layer only
+    # patches trace visibility and recolouring only patches z values; a new
+    # figure is sent when the viewport needs other tiles. Only polygons in
+    # those tiles are drawn, at a detail level that follows the zoom.
+    # timeline-shown records the timeline year on screen, if any
+    tiles = [list(tile) for tile in current_tiles or DEFAULT_TILES]
+    if relayout_data and 'mapbox.zoom' in relayout_data:
+        tiles = [list(tile) for tile in view_tiles(relayout_data)]
+
+    trigger = dash.ctx.triggered_id
+    same_tiles = tiles == current_tiles
+    if trigger == 'map-graph' and same_tiles:
+        raise PreventUpdate
+    # Only points, frequency colours and select all depend on the table filter
+    if trigger == 'table-query' and highlight_option != 'point' and (
+            color_option == 'timeline' or color_option == 'event' and not select_all):
+        raise PreventUpdate
+    if trigger == 'select-all' and color_option != 'event':
+        raise PreventUpdate
+
+    # Point clusters of the filtered events at the tiles' zoom level
+    points = None
+    if highlight_option == 'point':
+        with stage('cluster'):
+            points = query_clusters(query or {}, tiles[0][0])
+
+    if trigger == 'highlight-option' and same_tiles:
+        with stage('figure'):
+            return map_figures.visibility_patch(highlight_option, tiles, points), dash.no_update, dash.no_update
+
+    highlighted = totals = None
+    shown_year = None
+    # Overlap counts of selected events share the red of a single highlight
+    colorscale = MAP_COLORSCALE if color_option == 'event' else FREQUENCY_COLORSCALE
+    if color_option == 'event':
+        with stage('resolve_regions'):
+            highlighted, totals = selection_colours(query, select_all, selected_ids)
+    elif color_option == 'timeline':
+        with stage('timeline'):
+            shown_year = timeline_year
+            highlighted = timeline_regions(timeline_year)
     else:
-        selected_data = [table_data[i] for i in selected_rows]
-        selected_row = selected_data[0]
-
-        affected_states = selected_row['Affected State'].split(', ') if isinstance(selected_row['Affected State'], str) else []
-        affected_districts = selected_row['Affected District'].split(', ') if isinstance(selected_row['Affected District'], str) else []
-
-        matched_states = [process.extractOne(state, states_gdf['ST_NM'].unique())[0] for state in affected_states]
-        matched_states_gdf = states_gdf[states_gdf['ST_NM'].isin(matched_states)]
-
-        part_matched_districts = [process.extractOne(district, districts_gdf['Dist_Name'].unique())[0] for district in affected_districts]
-
-        matched_districts = []
-        for district in part_matched_districts:
-            state_name = districts_gdf[districts_gdf['Dist_Name'] == district]['State_Name'].values
-    
-            if state_name.size > 0 and state_name[0].title() in affected_states:
-                matched_districts.append(district)
-        
-        matched_districts_gdf = districts_gdf[districts_gdf['Dist_Name'].isin(matched_districts)]
-
-        if highlight_option == 'state':
-            geojson_data = matched_states_gdf.geometry.__geo_interface__
-            locations = matched_states_gdf.index
-            hover_name = 'ST_NM'
-        else:
-            geojson_data = matched_districts_gdf.geometry.__geo_interface__
-            locations = matched_districts_gdf.index
-            hover_name = 'Dist_Name'
-
-        fig = px.choropleth_mapbox(
-            matched_states_gdf if highlight_option == 'state' else matched_districts_gdf,
-            geojson=geojson_data,
-            locations=locations,
-            hover_name=hover_name, 
-            color_continuous_scale=['lightgrey', 'red'],
-            mapbox_style="carto-positron",
-            center={"lat": 22.5937, "lon": 78.9629},
-            zoom=3.3,
-            opacity=0.6
-        )
-
-    fig.update_layout(margin={"r": 0, "t": 0, "l": 0, "b": 0})
+        with stage('aggregate'):
+            totals = query_region_totals(query or {}, color_option)
+
+    with stage('figure'):
+        if trigger in ('color-option', 'table-query', 'select-all') and same_tiles:
+            return map_figures.colour_patch(highlighted, tiles, totals, points, colorscale), dash.no_update, shown_year
+        return map_figures.figure(highlight_option, highlighted, tiles, totals, points, colorscale), tiles, shown_year
+
+@app.callback(
+    Output('map-graph', 'figure', allow_duplicate=True),
+    Output('timeline-shown', 'data', allow_duplicate=True),
+    Input('timeline-year', 'value'),
+    State('color-option', 'value'),
+    State('timeline-shown', 'data'),
+    State('map-tiles', 'data'),
+    prevent_initial_call=True
+)
+@instrument('update_timeline_frame')
+def update_timeline_frame(timeline_year, color_option, shown_year, current_tiles):
+    # A playback frame only sends the z values that differ from the year on screen
+    if color_option != 'timeline' or timeline_year == shown_year:
+        raise PreventUpdate
+    tiles = current_tiles or DEFAULT_TILES
+    timeline = region_timeline(store.version)
+    with stage('figure'):
+        if shown_year is None:
+            return map_figures.colour_patch(timeline_regions(timeline_year), tiles), timeline_year
+        return map_figures.delta_patch(timeline.regions(shown_year), timeline.regions(timeline_year), tiles), timeline_year
+
+# Play/pause and stepping the slider run in the browser, see assets/clientside.js
+app.clientside_callback(
+    ClientsideFunction(namespace='flood', function_name='toggleTimeline'),
+    Output('timeline-interval', 'disabled'),
+    Output('timeline-play', 'children'),
+    Output('color-option', 'value'),
+    Input('timeline-play', 'n_clicks'),
+    State('timeline-interval', 'disabled'),
+    prevent_initial_call=True
+)
 
+app.clientside_callback(
+    ClientsideFunction(namespace='flood', function_name='advanceTimeline'),
+    Output('timeline-year', 'value'),
+    Input('timeline-interval', 'n_intervals'),
+    State('timeline-year', 'value'),
+    State('timeline-year', 'min'),
+    State('timeline-year', 'max'),
+    prevent_initial_call=True
+)
+
+TREND_TITLES = {
+    'count': 'Events',
+    'duration': 'Total duration (days)',
+    'fatalities': 'Human fatalities',
+}
+
+def trend_figure(labels, totals, measure):
+    # Stacked bars of a measure per period, one series per cause group
+    fig = go.Figure()
+    for cause, values in zip(CAUSE_NAMES, totals):
+        if values.any():
+            fig.add_trace(go.Bar(x=labels, y=values.tolist(), name=cause))
+    fig.update_layout(
+        barmode='stack',
+        height=320,
+        margin={"r": 10, "t": 10, "l": 50, "b": 40},
+        yaxis_title=TREND_TITLES[measure],
+        legend={'orientation': 'h', 'y': -0.2},
+    )
     return fig
 
+@app.callback(
+    Output('trend-graph', 'figure'),
+    Input('table-query', 'data'),
+    Input('trend-measure', 'value'),
+    Input('trend-period', 'value')
+)
+@instrument('update_trend_chart')
+@result_cache.memoize('update_trend_chart')
+def update_trend_chart(query, measure, period):
+    # Date and state filters slice the rollup cube. Its months follow the
+    # start date, so the date bounds are widened to whole months. Districts
+    # and point clusters are not cube dimensions: those filters roll up just
+    # the matching events
+    query = query or {}
+    with stage('rollup'):
+        if query.get('district') or query.get('cluster'):
+            cube = RollupCube.from_store(store, query_event_ids(query))
+            state_rows = None
+        else:
+            cube = rollup_cube(store.version)
+            state_rows = name_resolver.resolve_state(query['state']) if query.get('state') else None
+        labels, totals = cube.series(measure, query.get('start_date'), query.get('end_date'), state_rows, period)
+
+    with stage('figure'):
+        return trend_figure(labels, totals, measure)
 
 if __name__ == '__main__':
     app.run_server(debug=True)
\ No newline at end of file
@@ -0,0 +1,90 @@
+// Callbacks that only need data already in the browser, registered in app.py
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    flood: {
+        // District dropdown options from the static state -> district mapping
+        districtOptions: function (selectedState, districtsOfStates) {
+            if (!selectedState) {
+                return [];
+            }
+            return (districtsOfStates[selectedState] || []).map(function (district) {
+                return {label: district, value: district};
+            });
+        },
+
+        // Export URL for the submitted filter and the table's sort order
+        exportHref: function (query, sortBy) {
+            var params = new URLSearchParams();
+            Object.keys(query || {}).forEach(function (key) {
+                var value = query[key];
+                if (value !== null && value !== undefined && value !== '') {
+                    params.append(key, Array.isArray(value) ? value.join(',') : value);
+                }
+            });
+            if (sortBy && sortBy.length) {
+                params.append('sort', sortBy[0].column_id);
+                params.append('direction', sortBy[0].direction);
+            }
+            var search = params.toString();
+            return '/export.csv' + (search ? '?' + search : '');
+        },
+
+        // Recolour the regions of the selected events in the figure already on
+        // screen: only each trace's z values change, the geometry stays put.
+        // One event is highlighted; several shade each region by how many of
+        // them hit it, on a colour bar, as the server draws it. Traces of both
+        // layers are recoloured, trace.meta names the layer. In flood frequency
+        // modes and with select all the colours come from the server instead
+        highlightRegions: function (selectedIds, colorOption, selectAll, regionIndex, figure) {
+            if (!figure || !regionIndex || colorOption !== 'event' || (selectAll && selectAll.length)) {
+                return window.dash_clientside.no_update;
+            }
+            var eventIds = selectedIds || [];
+            var counts = {};
+            var maxCounts = {};
+            Object.keys(regionIndex).forEach(function (layer) {
+                var index = regionIndex[layer];
+                counts[layer] = {};
+                maxCounts[layer] = 1;
+                eventIds.forEach(function (eventId) {
+                    for (var i = index.offsets[eventId]; i < index.offsets[eventId + 1]; i++) {
+                        var count = (counts[layer][index.indices[i]] || 0) + 1;
+                        counts[layer][index.indices[i]] = count;
+                        maxCounts[layer] = Math.max(maxCounts[layer], count);
+                    }
+                });
+            });
+            var scaled = {};
+            var data = figure.data.map(function (trace) {
+                // The point trace has no regions to recolour
+                if (!trace.locations) {
+                    return trace;
+                }
+                var layerCounts = counts[trace.meta] || {};
+                var showscale = eventIds.length > 1 && !scaled[trace.meta];
+                scaled[trace.meta] = scaled[trace.meta] || showscale;
+                return Object.assign({}, trace, {
+                    z: trace.locations.map(function (location) {
+                        return layerCounts[location] || 0;
+                    }),
+                    zmax: eventIds.length > 1 ? maxCounts[trace.meta] || 1 : 1,
+                    showscale: showscale
+                });
+            });
+            return Object.assign({}, figure, {data: data});
+        },
+
+        // Play starts the interval that steps the timeline slider and switches
+        // the map to timeline colours; pressing again pauses
+        toggleTimeline: function (nClicks, disabled) {
+            if (disabled) {
+                return [false, 'Pause', 'timeline'];
+            }
+            return [true, 'Play', window.dash_clientside.no_update];
+        },
+
+        // One year further on every interval tick, back to the start after the last
+        advanceTimeline: function (nIntervals, year, minYear, maxYear) {
+            return year >= maxYear ? minYear : year + 1;
+        }
+    }
+});
@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+from contextvars import copy_context
+
+import numpy as np
+import plotly
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+
+# Repeated calls would only time the result cache; FLOOD_CACHE=local measures hits
+os.environ.setdefault('FLOOD_CACHE', 'off')
+
+import app
+
+# Latency, payload size and peak memory of the Dash callbacks, called directly
+# with representative inputs. Results go to a JSON file so runs can be diffed:
+#   python bench.py --repeat 50 --output bench_output.json
+
+# Inventory row 3: the September 1967 event covering 100+ districts of Odisha,
+# Bihar and Uttar Pradesh, the densest map render in the dataset
+DENSE_ROW = 3
+
+
+def _payload_bytes(output):
+    return len(json.dumps(output, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8'))
+
+
+def _in_callback_context(triggered_prop_id, function, *args):
+    # Callbacks read dash.callback_context, which only exists inside a request.
+    # triggered_prop_id None stands for the initial call on page load
+    def run():
+        triggered = [{'prop_id': triggered_prop_id, 'value': 1}] if triggered_prop_id else []
+        context_value.set(AttributeDict(triggered_inputs=triggered))
+        return function(*args)
+    return copy_context().run(run)
+
+
+def cases():
+    default_tiles = [list(tile) for tile in app.DEFAULT_TILES]
+    submit = 'submit-button.n_clicks'
+    return {
+        'update_data_table/empty_filter': lambda: _in_callback_context(
+            submit, app.update_data_table, 1, 0, 0, None, None, None, None, None),
+        'update_data_table/single_state': lambda: _in_callback_context(
+            submit, app.update_data_table, 1, 0, 0, None, '2000-01-01', '2023-09-10', 'Assam', None),
+        'update_table_page/empty_filter': lambda: app.update_table_page(
+            {}, 0, app.PAGE_SIZE, []),
+        'update_table_page/single_state': lambda: app.update_table_page(
+            {'start_date': '2000-01-01', 'end_date': '2023-09-10', 'state': 'Assam'}, 0, app.PAGE_SIZE, []),
+        'update_table_page/state_district_sorted': lambda: app.update_table_page(
+            {'state': 'Bihar', 'district': 'Patna'}, 0, app.PAGE_SIZE,
+            [{'column_id': 'Start Date', 'direction': 'desc'}]),
+        'update_datatable_interactivity/no_selection_state': lambda: _in_callback_context(
+            None, app.update_datatable_interactivity,
+            'state', 'event', {}, None, [], [], 1967, default_tiles),
+        'update_datatable_interactivity/no_selection_district': lambda: _in_callback_context(
+            None, app.update_datatable_interactivity,
+            'district', 'event', {}, None, [], [], 1967, default_tiles),
+        'update_datatable_interactivity/dense_row_state': lambda: _in_callback_context(
+            None, app.update_datatable_interactivity,
+            'state', 'event', {}, None, [], [DENSE_ROW], 1967, default_tiles),
+        'update_datatable_interactivity/dense_row_district': lambda: _in_callback_context(
+            None, app.update_datatable_interactivity,
+            'district', 'event', {}, None, [], [DENSE_ROW], 1967, default_tiles),
+        'update_datatable_interactivity/layer_switch': lambda: _in_callback_context(
+            'highlight-option.value', app.update_datatable_interactivity,
+            'district', 'event', {}, None, [], [DENSE_ROW], 1967, default_tiles),
+        'update_datatable_interactivity/pan_to_new_tiles': lambda: _in_callback_context(
+            'map-graph.relayoutData', app.update_datatable_interactivity,
+            'district', 'event', {}, {'mapbox.zoom': 6, 'mapbox.center': {'lon': 85, 'lat': 20}}, [], [DENSE_ROW], 1967, default_tiles),
+        'update_datatable_interactivity/frequency_all_events': lambda: _in_callback_context(
+            'color-option.value', app.update_datatable_interactivity,
+            'district', 'count', {}, None, [], [], 1967, default_tiles),
+        'update_datatable_interactivity/fatalities_single_state': lambda: _in_callback_context(
+            'table-query.data', app.update_datatable_interactivity,
+            'district', 'fatalities', {'state': 'Assam'}, None, [], [], 1967, default_tiles),
+        'update_datatable_interactivity/timeline_mode': lambda: _in_callback_context(
+            'color-option.value', app.update_datatable_interactivity,
+            'district', 'timeline', {}, None, [], [], 2005, default_tiles),
+        'update_datatable_interactivity/multi_select_district': lambda: _in_callback_context(
+            'color-option.value', app.update_datatable_interactivity,
+            'district', 'event', {}, None, [], list(range(DENSE_ROW, DENSE_ROW + 25)), 1967, default_tiles),
+        'update_datatable_interactivity/select_all_filtered': lambda: _in_callback_context(
+            'select-all.value', app.update_datatable_interactivity,
+            'district', 'event', {}, None, ['all'], [], 1967, default_tiles),
+        'update_timeline_frame/next_year': lambda: app.update_timeline_frame(
+            2006, 'timeline', 2005, default_tiles),
+        'update_timeline_frame/decade_jump': lambda: app.update_timeline_frame(
+            2015, 'timeline', 2005, default_tiles),
+        'update_trend_chart/all_events_yearly': lambda: app.update_trend_chart({}, 'count', 'year'),
+        'update_trend_chart/state_dates_monthly': lambda: app.update_trend_chart(
+            {'start_date': '2000-01-01', 'end_date': '2023-09-10', 'state': 'Assam'}, 'fatalities', 'month'),
+        'update_trend_chart/district_fallback': lambda: app.update_trend_chart(
+            {'state': 'Bihar', 'district': 'Patna'}, 'duration', 'year'),
+    }
+
+
+def measure(case, repeat):
+    # The first call is reported on its own since later calls may hit caches
+    tracemalloc.start()
+    start = time.perf_counter()
+    output = case()
+    cold = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case()
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+
+    return {
+        'cold_ms': round(cold * 1000, 3),
+        'p50_ms': round(float(np.percentile(timings, 50)), 3),
+        'p90_ms': round(float(np.percentile(timings, 90)), 3),
+        'p99_ms': round(float(np.percentile(timings, 99)), 3),
+        'max_ms': round(float(timings.max()), 3),
+        'payload_bytes': _payload_bytes(output),
+        'peak_memory_bytes': peak,
+    }
+
+
+def run(repeat, only=None):
+    results = {}
+    for name, case in cases().items():
+        if only and only not in name:
+            continue
+        results[name] = measure(case, repeat)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--only', help='run the cases whose name contains this')
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.only)
+    report = {
+        'python': platform.python_version(),
+        'events': len(app.store),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+
+    for name, result in results.items():
+        print(f"{name:60} p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms  "
+              f"{result['payload_bytes']:>9} B")
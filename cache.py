@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+# Memoised callback results, keyed on the callback name, its normalised
+# inputs and the dataset version, in two tiers: a per-process LRU and a tier
+# shared by every worker on the host. FLOOD_CACHE picks the shared tier:
+#   sqlite (default)  a SQLite file at FLOOD_CACHE_PATH
+#   redis://...       a Redis server (needs the redis package)
+#   local             the in-process LRU only
+#   off               no caching
+# Entries live FLOOD_CACHE_TTL seconds. A new dataset version (a changed
+# source file or ingested events) changes every key, so stale results are
+# never read and simply expire.
+CACHE_BACKEND = os.environ.get('FLOOD_CACHE', 'sqlite')
+CACHE_PATH = os.environ.get('FLOOD_CACHE_PATH', 'cache/results.sqlite')
+CACHE_TTL = float(os.environ.get('FLOOD_CACHE_TTL', '3600'))
+LOCAL_MAXSIZE = 512
+# Bump when the output of a cached function changes shape
+CACHE_FORMAT_VERSION = 1
+SQLITE_PURGE_EVERY = 200
+
+
+def normalize(value):
+    # Equivalent inputs give the same key: dict order and None entries are ignored
+    if isinstance(value, dict):
+        return {str(key): normalize(item) for key, item in sorted(value.items()) if item is not None}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    return value
+
+
+class LocalTier:
+    def __init__(self, maxsize=LOCAL_MAXSIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False, None
+            value, expires = entry
+            if expires < time.time():
+                del self.entries[key]
+                return False, None
+            self.entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, expires):
+        with self._lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+class SQLiteTier:
+    # One file for all workers; a connection per process and thread, opened
+    # lazily so a preloading gunicorn master never hands one to its workers.
+    # Errors (e.g. a locked database) count as misses, never as failures
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+
+    def _connection(self):
+        if getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB, expires REAL)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def get(self, key):
+        try:
+            row = self._connection().execute(
+                'SELECT value FROM results WHERE key = ? AND expires >= ?', (key, time.time())).fetchone()
+        except sqlite3.Error:
+            return False, None
+        if row is None:
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def set(self, key, value, expires):
+        try:
+            connection = self._connection()
+            connection.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?)',
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires))
+            self._sets += 1
+            if self._sets % SQLITE_PURGE_EVERY == 0:
+                connection.execute('DELETE FROM results WHERE expires < ?', (time.time(),))
+        except sqlite3.Error:
+            pass
+
+
+class RedisTier:
+    def __init__(self, url):
+        # Optional dependency, only imported when a Redis URL is configured
+        import redis
+
+        self.errors = redis.RedisError
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        try:
+            data = self.client.get(key)
+        except self.errors:
+            return False, None
+        if data is None:
+            return False, None
+        return True, pickle.loads(data)
+
+    def set(self, key, value, expires):
+        try:
+            self.client.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                            ex=max(1, int(expires - time.time())))
+        except self.errors:
+            pass
+
+
+def shared_tier(backend=CACHE_BACKEND, path=CACHE_PATH):
+    # path is the SQLite file, other backends ignore it
+    if backend == 'sqlite':
+        return SQLiteTier(path)
+    if backend.startswith('redis://') or backend.startswith('rediss://'):
+        return RedisTier(backend)
+    return None
+
+
+class ResultCache:
+    # version is a function returning the current dataset version
+    def __init__(self, version, backend=CACHE_BACKEND, ttl=CACHE_TTL, maxsize=LOCAL_MAXSIZE, path=CACHE_PATH):
+        self.version = version
+        self.enabled = backend != 'off'
+        self.local = LocalTier(maxsize)
+        self.shared = shared_tier(backend, path) if self.enabled else None
+        self.ttl = ttl
+
+    def key(self, name, args):
+        payload = json.dumps(
+            [CACHE_FORMAT_VERSION, self.version(), name, normalize(list(args))], sort_keys=True, default=str)
+        return f'{name}:{hashlib.sha1(payload.encode("utf-8")).hexdigest()}'
+
+    def memoize(self, name):
+        # Decorator for functions of JSON-like arguments with picklable results
+        def decorator(function):
+            if not self.enabled:
+                return function
+
+            @wraps(function)
+            def wrapper(*args):
+                key = self.key(name, args)
+                hit, value = self.local.get(key)
+                if hit:
+                    return value
+                if self.shared is not None:
+                    hit, value = self.shared.get(key)
+                    if hit:
+                        self.local.set(key, value, time.time() + self.ttl)
+                        return value
+
+                value = function(*args)
+                expires = time.time() + self.ttl
+                self.local.set(key, value, expires)
+                if self.shared is not None:
+                    self.shared.set(key, value, expires)
+                return value
+            return wrapper
+        return decorator
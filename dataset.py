@@ -0,0 +1,197 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from store import INVENTORY_PATH, read_inventory
+
+DISTRICTS_PATH = 'src/India_Districts.shp'
+STATES_PATH = 'src/india_states.shp'
+
+# Cleaned inventory and shapefile geometry as plain .npy files. Numeric columns
+# are memory mapped straight from disk, so a valid cache needs neither the CSV
+# parser nor geopandas/pyproj.
+DATASET_CACHE_DIR = 'cache/data'
+DATASET_CACHE_VERSION = 3
+SHAPEFILE_PARTS = ['.shp', '.shx', '.dbf', '.prj', '.cpg']
+LAYER_COLUMNS = {
+    'states': ['ST_NM'],
+    'districts': ['Dist_Name', 'State_Name'],
+}
+STRING_COLUMNS = ['Affected State', 'Affected District']
+
+
+class Layer:
+    # Shapefile attribute columns plus a shapely geometry array
+    def __init__(self, columns, geometry):
+        self.columns = columns
+        self.geometry = geometry
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __len__(self):
+        return len(self.geometry)
+
+
+def read_layer(path, columns):
+    # geopandas (and pyproj through it) is only imported on a cache miss
+    import geopandas as gpd
+
+    gdf = gpd.read_file(path, columns=columns)
+    return Layer(
+        {column: gdf[column].to_numpy(dtype=object) for column in columns},
+        np.asarray(gdf.geometry.values, dtype=object),
+    )
+
+
+def _shapefile_files(states_path, districts_path):
+    files = []
+    for path in [states_path, districts_path]:
+        stem = os.path.splitext(path)[0]
+        files.extend(stem + part for part in SHAPEFILE_PARTS if os.path.exists(stem + part))
+    return files
+
+
+def _save_bytes(directory, name, values):
+    # Variable length values as one byte blob plus offsets; None is kept as -1 length
+    present = np.array([value is not None for value in values], dtype=bool)
+    lengths = np.array([len(value) if value is not None else 0 for value in values], dtype=np.int64)
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    blob = np.frombuffer(b''.join(value for value in values if value is not None), dtype=np.uint8)
+    np.save(os.path.join(directory, f'{name}.blob.npy'), blob)
+    np.save(os.path.join(directory, f'{name}.offsets.npy'), offsets)
+    np.save(os.path.join(directory, f'{name}.present.npy'), present)
+
+
+def _load_bytes(directory, name):
+    blob = np.load(os.path.join(directory, f'{name}.blob.npy'), mmap_mode='r')
+    offsets = np.load(os.path.join(directory, f'{name}.offsets.npy'))
+    present = np.load(os.path.join(directory, f'{name}.present.npy'))
+    data = blob.tobytes() if len(blob) else b''
+    return [
+        data[offsets[i]:offsets[i + 1]] if present[i] else None
+        for i in range(len(present))
+    ]
+
+
+def _save_strings(directory, name, values):
+    _save_bytes(directory, name, [value.encode('utf-8') if isinstance(value, str) else None for value in values])
+
+
+def _load_strings(directory, name):
+    return np.array(
+        [value.decode('utf-8') if value is not None else np.nan for value in _load_bytes(directory, name)],
+        dtype=object,
+    )
+
+
+def write_cache(frame, layers, checksums, cache_dir=DATASET_CACHE_DIR):
+    # Written to a private directory then swapped in, so booting workers never
+    # see a half written cache
+    temporary_dir = f'{cache_dir}.{os.getpid()}'
+    shutil.rmtree(temporary_dir, ignore_errors=True)
+    os.makedirs(temporary_dir)
+
+    np.save(os.path.join(temporary_dir, 'start.npy'), frame['Start Date'].to_numpy())
+    np.save(os.path.join(temporary_dir, 'end.npy'), frame['End Date'].to_numpy())
+    np.save(os.path.join(temporary_dir, 'duration.npy'), frame['Duration (in days)'].to_numpy())
+    np.save(os.path.join(temporary_dir, 'fatalities.npy'), frame['Human Fatalities'].to_numpy())
+    np.save(os.path.join(temporary_dir, 'latitude.npy'), frame['Latitude'].to_numpy())
+    np.save(os.path.join(temporary_dir, 'longitude.npy'), frame['Longitude'].to_numpy())
+    np.save(os.path.join(temporary_dir, 'cause.codes.npy'), frame['Main Cause'].cat.codes.to_numpy())
+    _save_strings(temporary_dir, 'cause.categories', frame['Main Cause'].cat.categories)
+    for column in STRING_COLUMNS:
+        _save_strings(temporary_dir, column, frame[column])
+
+    for name, layer in layers.items():
+        _save_bytes(temporary_dir, f'{name}.geometry', list(shapely.to_wkb(layer.geometry)))
+        for column in LAYER_COLUMNS[name]:
+            _save_strings(temporary_dir, f'{name}.{column}', layer[column])
+
+    manifest = {'version': DATASET_CACHE_VERSION, 'sources': checksums}
+    with open(os.path.join(temporary_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    try:
+        os.replace(temporary_dir, cache_dir)
+    except OSError:
+        # Another worker swapped its copy in first
+        shutil.rmtree(temporary_dir, ignore_errors=True)
+
+
+def read_cache(cache_dir=DATASET_CACHE_DIR):
+    cause_codes = np.load(os.path.join(cache_dir, 'cause.codes.npy'), mmap_mode='r')
+    cause_categories = _load_strings(cache_dir, 'cause.categories')
+    frame = pd.DataFrame({
+        'Start Date': np.load(os.path.join(cache_dir, 'start.npy'), mmap_mode='r'),
+        'End Date': np.load(os.path.join(cache_dir, 'end.npy'), mmap_mode='r'),
+        'Duration (in days)': np.load(os.path.join(cache_dir, 'duration.npy'), mmap_mode='r'),
+        'Main Cause': pd.Categorical.from_codes(cause_codes, categories=cause_categories),
+        'Affected State': _load_strings(cache_dir, 'Affected State'),
+        'Affected District': _load_strings(cache_dir, 'Affected District'),
+        'Human Fatalities': np.load(os.path.join(cache_dir, 'fatalities.npy'), mmap_mode='r'),
+        'Latitude': np.load(os.path.join(cache_dir, 'latitude.npy'), mmap_mode='r'),
+        'Longitude': np.load(os.path.join(cache_dir, 'longitude.npy'), mmap_mode='r'),
+    }, copy=False)
+
+    layers = {}
+    for name, columns in LAYER_COLUMNS.items():
+        geometry = shapely.from_wkb(np.array(_load_bytes(cache_dir, f'{name}.geometry'), dtype=object))
+        layers[name] = Layer(
+            {column: _load_strings(cache_dir, f'{name}.{column}') for column in columns},
+            geometry,
+        )
+    return frame, layers
+
+
+def _cache_is_valid(checksums, cache_dir):
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    return manifest == {'version': DATASET_CACHE_VERSION, 'sources': checksums}
+
+
+def load_dataset(inventory_path=INVENTORY_PATH, states_path=STATES_PATH, districts_path=DISTRICTS_PATH,
+                 cache_dir=DATASET_CACHE_DIR):
+    # Returns the cleaned inventory frame, the {'states', 'districts'} layers,
+    # the source files' checksums and the inventory's size in bytes, from the
+    # binary cache when it matches the source files, rebuilding it otherwise.
+    # The inventory is read once, so its checksum, the frame and the size all
+    # describe the same bytes; rows appended meanwhile lie past the size, where
+    # InventoryFollower starts
+    with open(inventory_path, 'rb') as f:
+        inventory = f.read()
+    checksums = {inventory_path: hashlib.sha1(inventory).hexdigest()}
+    for path in _shapefile_files(states_path, districts_path):
+        with open(path, 'rb') as f:
+            checksums[path] = hashlib.sha1(f.read()).hexdigest()
+    if _cache_is_valid(checksums, cache_dir):
+        frame, layers = read_cache(cache_dir)
+        return frame, layers, checksums, len(inventory)
+
+    frame = read_inventory(io.BytesIO(inventory))
+    layers = {
+        'states': read_layer(states_path, LAYER_COLUMNS['states']),
+        'districts': read_layer(districts_path, LAYER_COLUMNS['districts']),
+    }
+    write_cache(frame, layers, checksums, cache_dir)
+    return frame, layers, checksums, len(inventory)
+
+
+if __name__ == '__main__':
+    # Build step: python dataset.py [cache_dir]
+    cache_dir = sys.argv[1] if len(sys.argv) > 1 else DATASET_CACHE_DIR
+    frame, layers, _, _ = load_dataset(cache_dir=cache_dir)
+    print(f'{len(frame)} events, {len(layers["states"])} states, '
+          f'{len(layers["districts"])} districts cached in {cache_dir}')
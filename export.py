@@ -0,0 +1,50 @@
+from flask import Response, abort, request, stream_with_context
+
+from points import MORTON_BITS
+from store import DISPLAY_COLUMNS, format_for_display
+
+# The filtered events as a CSV download, streamed in chunks so neither the
+# server nor the browser ever holds the whole result as one response:
+#   /export.csv?start_date=2000-01-01&state=Assam&sort=Start Date&direction=desc
+# Query parameters mirror the table-query store, a point cluster is "level,cell".
+EXPORT_CHUNK_ROWS = 1000
+QUERY_PARAMETERS = ['start_date', 'end_date', 'state', 'district']
+
+
+def query_from_args(args):
+    query = {key: args[key] for key in QUERY_PARAMETERS if args.get(key)}
+    if args.get('cluster'):
+        # Raises ValueError, answered with 400, unless it is a cell of the Morton grid
+        level, cell = [int(value) for value in args['cluster'].split(',')]
+        if not 0 <= level <= MORTON_BITS or not 0 <= cell < 4 ** level:
+            raise ValueError(args['cluster'])
+        query['cluster'] = [level, cell]
+    return query
+
+
+def export_rows(store, ids, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Header first, then the rows chunk by chunk, formatted like the table
+    yield format_for_display(store.frame.iloc[:0]).to_csv(index=False)
+    for start in range(0, len(ids), chunk_rows):
+        chunk = store.frame.iloc[ids[start:start + chunk_rows]]
+        yield format_for_display(chunk).to_csv(index=False, header=False)
+
+
+def register_export_route(server, store, query_event_ids):
+    # query_event_ids is the table's own query function, so the export always
+    # matches the rows the table pages through
+    @server.route('/export.csv')
+    def export_csv():
+        sort = request.args.get('sort')
+        if sort and sort not in DISPLAY_COLUMNS:
+            abort(400)
+        try:
+            ids = query_event_ids(query_from_args(request.args))
+        except ValueError:
+            abort(400)
+        if sort:
+            ids = store.sort(ids, sort, request.args.get('direction', 'asc') == 'asc')
+
+        response = Response(stream_with_context(export_rows(store, ids)), mimetype='text/csv')
+        response.headers['Content-Disposition'] = 'attachment; filename=flood_events.csv'
+        return response
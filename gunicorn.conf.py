@@ -0,0 +1,19 @@
+import gc
+import multiprocessing
+import os
+
+# Production settings, picked up automatically by `gunicorn app:server`.
+# The app module is imported once in the master (preload_app) so the dataset,
+# indexes, map tiles and base figures are built a single time and shared
+# copy-on-write by every forked worker. See BENCHMARK.md for measurements.
+bind = f"0.0.0.0:{os.environ.get('PORT', '8050')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', min(4, multiprocessing.cpu_count() * 2)))
+preload_app = True
+timeout = 60
+accesslog = '-'
+
+
+def pre_fork(server, worker):
+    # Move everything built during preload out of the collector's reach; a GC
+    # pass would otherwise write to those objects and un-share their pages
+    gc.freeze()
@@ -0,0 +1,112 @@
+import csv
+import io
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from dataset import load_dataset
+from names import build_name_resolver
+from store import INVENTORY_PATH, read_inventory
+
+# New flood events are appended to the inventory CSV, never rewritten:
+#   python ingest.py new_events.csv [more.csv ...]
+# The new files need the inventory's Start/End/State/Districts/... columns
+# with DD/MM/YYYY dates, other inventory columns are optional. Their spellings are
+# resolved and saved to the name table before the rows are appended, and the
+# binary dataset cache is rebuilt for the next start. Running workers follow
+# the CSV (see InventoryFollower) and only parse the appended bytes.
+INGEST_POLL_SECONDS = 5
+
+
+def read_rows_from(path, offset):
+    # Inventory rows written after a byte offset, parsed with the CSV header.
+    # A line still being written is left for the next call
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(max(offset, len(header)))
+        data = f.read()
+    data = data[:data.rfind(b'\n') + 1]
+    end = max(offset, len(header)) + len(data)
+    if not data.strip():
+        return None, end
+    return read_inventory(io.BytesIO(header + data)), end
+
+
+def append_inventory(source_path, inventory_path=INVENTORY_PATH):
+    # Appends the rows of source_path, as written, in the inventory's column
+    # order. Check them with read_inventory first
+    raw = pd.read_csv(source_path, dtype=str, keep_default_na=False)
+    with open(inventory_path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f))
+
+    with open(inventory_path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        needs_newline = f.read(1) != b'\n'
+    data = raw.reindex(columns=header, fill_value='').to_csv(header=False, index=False, lineterminator='\n')
+    # A single write, so a following worker never sees a partial row for long
+    with open(inventory_path, 'a', newline='', encoding='utf-8') as f:
+        f.write(('\n' if needs_newline else '') + data)
+
+
+class InventoryFollower:
+    # Keeps a store in step with rows appended to the inventory CSV after it
+    # was loaded, checked before each request. With a threaded server (python
+    # app.py) other requests may be querying meanwhile; FloodStore.append
+    # swaps the new events in at once, and the lock keeps appends one at a time.
+    # offset is the size of the inventory the store was loaded from, see
+    # load_dataset: rows appended while the app was starting are still ahead
+    def __init__(self, store, resolver, offset, path=INVENTORY_PATH, poll_seconds=INGEST_POLL_SECONDS):
+        self.store = store
+        self.resolver = resolver
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.offset = offset
+        self.checked = time.monotonic()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        # At most one stat call every poll_seconds; True when events were added
+        now = time.monotonic()
+        if now - self.checked < self.poll_seconds or not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self.checked = now
+            # A file that shrank was rewritten rather than appended to and
+            # needs a restart
+            if os.path.getsize(self.path) <= self.offset:
+                return False
+            frame, self.offset = read_rows_from(self.path, self.offset)
+            if frame is None:
+                return False
+            # Spellings resolved by ingest.py, so workers skip the fuzzy matching
+            self.resolver.load()
+            self.store.append(frame, self.resolver)
+            return True
+        finally:
+            self._lock.release()
+
+
+def register_ingest_hook(server, follower):
+    @server.before_request
+    def follow_inventory():
+        follower.refresh()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit('usage: python ingest.py new_events.csv [more.csv ...]')
+
+    frame, layers, _, _ = load_dataset()
+    for source_path in sys.argv[1:]:
+        # Parsed up front, so a bad date or missing column stops before anything is written
+        new_rows = read_inventory(source_path)
+        # Resolved first, so workers find the new spellings in the name table
+        build_name_resolver(new_rows, layers['states'], layers['districts'])
+        append_inventory(source_path)
+        print(f'{len(new_rows)} events appended from {source_path}')
+
+    frame, layers, _, _ = load_dataset()
+    print(f'{len(frame)} events in the inventory, dataset cache rebuilt')
@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.request
+
+# HTTP load generator used for the numbers in BENCHMARK.md.
+#   python loadtest.py http://127.0.0.1:8050 --threads 8 --seconds 20 --pid <server pid>
+# Each client loops over the requests a user session makes: the page, a table
+# page, a row click on the map in both layers and one map tile.
+
+
+def _post_callback(base_url, output, outputs, inputs, state, changed):
+    body = json.dumps({
+        'output': output,
+        'outputs': outputs,
+        'inputs': inputs,
+        'state': state,
+        'changedPropIds': changed,
+    }).encode('utf-8')
+    request = urllib.request.Request(
+        f'{base_url}/_dash-update-component', data=body, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return response.read()
+
+
+def table_page(base_url):
+    properties = ['data', 'tooltip_data', 'page_count', 'selected_rows']
+    response = _post_callback(
+        base_url,
+        '..' + '...'.join(f'datatable-interactivity.{p}' for p in properties) + '..',
+        [{'id': 'datatable-interactivity', 'property': p} for p in properties],
+        [
+            {'id': 'table-query', 'property': 'data', 'value': {'state': 'Odisha'}},
+            {'id': 'datatable-interactivity', 'property': 'page_current', 'value': 0},
+            {'id': 'datatable-interactivity', 'property': 'page_size', 'value': 50},
+            {'id': 'datatable-interactivity', 'property': 'sort_by', 'value': []},
+        ],
+        [],
+        ['table-query.data'],
+    )
+    return json.loads(response)['response']['datatable-interactivity']['data']
+
+
+def map_click(base_url, table_data, highlight_option):
+    # A layer switch with the first row of the table page selected
+    return _post_callback(
+        base_url,
+        '..map-graph.figure...map-tiles.data...timeline-shown.data..',
+        [
+            {'id': 'map-graph', 'property': 'figure'},
+            {'id': 'map-tiles', 'property': 'data'},
+            {'id': 'timeline-shown', 'property': 'data'},
+        ],
+        [
+            {'id': 'highlight-option', 'property': 'value', 'value': highlight_option},
+            {'id': 'color-option', 'property': 'value', 'value': 'event'},
+            {'id': 'table-query', 'property': 'data', 'value': {}},
+            {'id': 'map-graph', 'property': 'relayoutData', 'value': None},
+            {'id': 'select-all', 'property': 'value', 'value': []},
+        ],
+        [
+            {'id': 'datatable-interactivity', 'property': 'derived_virtual_selected_row_ids',
+             'value': [table_data[0]['id']]},
+            {'id': 'timeline-year', 'property': 'value', 'value': 1967},
+            {'id': 'map-tiles', 'property': 'data', 'value': None},
+        ],
+        ['highlight-option.value'],
+    )
+
+
+def session(base_url, table_data):
+    with urllib.request.urlopen(f'{base_url}/') as response:
+        response.read()
+    table_page(base_url)
+    map_click(base_url, table_data, 'state')
+    map_click(base_url, table_data, 'district')
+    with urllib.request.urlopen(f'{base_url}/tiles/district/3/5/3.json') as response:
+        response.read()
+    return 5
+
+
+def process_memory(pid):
+    # RSS and PSS (RSS with shared pages split between sharers) in MiB for a
+    # process and its direct children, e.g. a gunicorn master and its workers
+    pids = [pid]
+    children_path = f'/proc/{pid}/task/{pid}/children'
+    if os.path.exists(children_path):
+        with open(children_path) as f:
+            pids.extend(int(child) for child in f.read().split())
+    memory = {}
+    for process_id in pids:
+        values = {}
+        with open(f'/proc/{process_id}/smaps_rollup') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in ('Rss', 'Pss'):
+                    values[key] = int(rest.split()[0]) / 1024
+        memory[process_id] = values
+    return memory
+
+
+def run(base_url, threads, seconds):
+    table_data = table_page(base_url)
+    counts = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def client(index):
+        while time.perf_counter() < deadline:
+            counts[index] += session(base_url, table_data)
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('base_url')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--pid', type=int, help='server process to report memory for')
+    args = parser.parse_args()
+
+    print(f'{run(args.base_url, args.threads, args.seconds):.1f} requests/sec')
+    if args.pid:
+        for process_id, values in process_memory(args.pid).items():
+            print(f'pid {process_id}: RSS {values["Rss"]:.1f} MiB, PSS {values["Pss"]:.1f} MiB')
@@ -0,0 +1,358 @@
+import hashlib
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+from dash import Patch
+from flask import Response, abort, request
+from shapely import STRtree, box, simplify, to_geojson, to_wkb
+
+MAP_CENTER = {"lat": 22.5937, "lon": 78.9629}
+MAP_ZOOM = 3.3
+# Regions are drawn light grey and highlighted red through their z value, so a
+# highlight can be recoloured in place without touching the geometry
+MAP_COLORSCALE = [[0.0, 'lightgrey'], [1.0, 'red']]
+# Flood frequency mode shades regions by a total over the filtered events
+FREQUENCY_COLORSCALE = 'YlOrRd'
+# Clusters of geolocated events, see points.py
+POINT_COLOR = 'royalblue'
+
+# (minimum map zoom, simplification tolerance in degrees). The country view at
+# zoom 3.3 cannot show detail below ~0.02 degrees, full resolution is only sent
+# once the user has zoomed right in.
+SIMPLIFY_TIERS = [
+    (0, 0.02),
+    (5, 0.005),
+    (7, 0.001),
+    (9, None),
+]
+
+# Polygons are served in z/x/y web mercator tiles. Tile zoom follows the map
+# zoom within this range, coarser views reuse the lowest level.
+MIN_TILE_ZOOM = 3
+MAX_TILE_ZOOM = 10
+TILE_CACHE_DIR = 'cache/tiles'
+
+# Rough size of the map-graph viewport, used when plotly only reports center/zoom
+VIEWPORT_PIXELS = (800, 600)
+INDIA_BOUNDS = (68.0, 6.0, 98.0, 37.5)
+
+
+def zoom_tier(zoom):
+    tier = 0
+    for index, (min_zoom, _) in enumerate(SIMPLIFY_TIERS):
+        if zoom >= min_zoom:
+            tier = index
+    return tier
+
+
+def tile_zoom(zoom):
+    return min(MAX_TILE_ZOOM, max(MIN_TILE_ZOOM, int(zoom)))
+
+
+def tile_bounds(z, x, y):
+    n = 2 ** z
+    west = x / n * 360 - 180
+    east = (x + 1) / n * 360 - 180
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def tile_in_india(z, x, y):
+    # Only tiles over INDIA_BOUNDS can hold a region, any other is never cut
+    west, south, east, north = tile_bounds(z, x, y)
+    return (west <= INDIA_BOUNDS[2] and east >= INDIA_BOUNDS[0]
+            and south <= INDIA_BOUNDS[3] and north >= INDIA_BOUNDS[1])
+
+
+def _tile_xy(lon, lat, z):
+    n = 2 ** z
+    lat = max(-85.0, min(85.0, lat))
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(n - 1, max(0, x)), min(n - 1, max(0, y))
+
+
+def tiles_for_bounds(bounds, z):
+    # Clamped to INDIA_BOUNDS, so every tile can be served; a view panned off
+    # the country keeps the tiles along its nearest edge
+    west, east = (min(max(lon, INDIA_BOUNDS[0]), INDIA_BOUNDS[2]) for lon in (bounds[0], bounds[2]))
+    south, north = (min(max(lat, INDIA_BOUNDS[1]), INDIA_BOUNDS[3]) for lat in (bounds[1], bounds[3]))
+    x0, y0 = _tile_xy(west, north, z)
+    x1, y1 = _tile_xy(east, south, z)
+    return tuple((z, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+
+
+def viewport_bounds(relayout_data, zoom):
+    # Visible lon/lat box from a map-graph relayoutData event
+    derived = (relayout_data or {}).get('mapbox._derived')
+    if derived and derived.get('coordinates'):
+        lons = [lon for lon, _ in derived['coordinates']]
+        lats = [lat for _, lat in derived['coordinates']]
+        return min(lons), min(lats), max(lons), max(lats)
+
+    center = (relayout_data or {}).get('mapbox.center')
+    if not center:
+        return INDIA_BOUNDS
+    degrees_per_pixel = 360 / (512 * 2 ** zoom)
+    half_width = VIEWPORT_PIXELS[0] * degrees_per_pixel / 2
+    half_height = VIEWPORT_PIXELS[1] * degrees_per_pixel / 2 * math.cos(math.radians(center['lat']))
+    return (
+        center['lon'] - half_width, center['lat'] - half_height,
+        center['lon'] + half_width, center['lat'] + half_height,
+    )
+
+
+def view_tiles(relayout_data=None):
+    # Tiles covering the current viewport; the default view before any pan/zoom
+    zoom = (relayout_data or {}).get('mapbox.zoom', MAP_ZOOM)
+    bounds = viewport_bounds(relayout_data, zoom)
+    return tiles_for_bounds(bounds, tile_zoom(zoom))
+
+
+DEFAULT_TILES = view_tiles()
+
+
+def _dump_geojson(geometry, ids):
+    # FeatureCollection whose feature ids are the layer rows, matching trace locations
+    features = ','.join(
+        f'{{"type":"Feature","id":"{i}","properties":{{}},"geometry":{geojson}}}'
+        for i, geojson in zip(ids, to_geojson(geometry[ids]))
+    )
+    return f'{{"type":"FeatureCollection","features":[{features}]}}'.encode('utf-8')
+
+
+class MapLayer:
+    # A shapefile layer served as GeoJSON tiles. Geometry is simplified once per
+    # tier and tiles are cut through an STRtree, then kept on disk so workers
+    # and restarts share them.
+    def __init__(self, name, layer, hover_column, cache_dir=TILE_CACHE_DIR):
+        self.name = name
+        self.hover_names = np.asarray(layer[hover_column], dtype=object)
+        self.tree = STRtree(layer.geometry)
+        self.tiers = []
+        for _, tolerance in SIMPLIFY_TIERS:
+            geometry = layer.geometry
+            if tolerance is not None:
+                # preserve_topology keeps every polygon valid at coarse tolerances
+                geometry = simplify(geometry, tolerance, preserve_topology=True)
+            self.tiers.append(geometry)
+
+        # Cached tiles are only valid for the geometry they were cut from and
+        # the simplification each tile zoom was cut at
+        tiers = [(z, SIMPLIFY_TIERS[zoom_tier(z)]) for z in range(MIN_TILE_ZOOM, MAX_TILE_ZOOM + 1)]
+        fingerprint = hashlib.sha1(
+            b''.join(to_wkb(layer.geometry)) + repr(tiers).encode('utf-8')).hexdigest()[:12]
+        self.cache_dir = os.path.join(cache_dir, f'{name}-{fingerprint}')
+        self.tile_ids = lru_cache(maxsize=4096)(self._tile_ids)
+        self.tile = lru_cache(maxsize=1024)(self._tile)
+
+    def tile_url(self, z, x, y):
+        return f'/tiles/{self.name}/{z}/{x}/{y}.json'
+
+    def _tile_ids(self, z, x, y):
+        # Sorted rows of every polygon touching the tile
+        return tuple(sorted(int(i) for i in self.tree.query(box(*tile_bounds(z, x, y)), predicate='intersects')))
+
+    def _tile(self, z, x, y):
+        path = os.path.join(self.cache_dir, str(z), str(x), f'{y}.json')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return f.read()
+
+        ids = list(self.tile_ids(z, x, y))
+        data = _dump_geojson(self.tiers[zoom_tier(z)], ids)
+        # Empty tiles are cheap to cut and would only fill the disk
+        if not ids:
+            return data
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f'{path}.{os.getpid()}'
+        with open(temporary_path, 'wb') as f:
+            f.write(data)
+        os.replace(temporary_path, path)
+        return data
+
+
+def _point_properties(points):
+    # Cluster markers, sized by event count; customdata is the cluster's
+    # (level, cell) for drilling into its events
+    if points is None:
+        return {'lon': [], 'lat': [], 'text': [], 'customdata': [], 'marker': {'color': POINT_COLOR}}
+    return {
+        'lon': points['lon'].tolist(),
+        'lat': points['lat'].tolist(),
+        'text': points['counts'].tolist(),
+        'customdata': [[points['level'], int(cell)] for cell in points['cells']],
+        'marker': {
+            'color': POINT_COLOR,
+            'opacity': 0.7,
+            'size': (8 + 4 * np.log2(points['counts'])).tolist(),
+        },
+    }
+
+
+class MapFigures:
+    # One persistent figure per set of visible tiles: every layer gets a trace per
+    # tile, whose GeoJSON is fetched by URL so the browser loads polygons only
+    # for the viewport, and only once per tile. Highlights live in each trace's
+    # z vector and the radio only toggles trace visibility, so both are small
+    # partial updates rather than new figures.
+    def __init__(self, layers, maxsize=256):
+        self.layers = {layer.name: layer for layer in layers}
+        self._figure = lru_cache(maxsize=maxsize)(self._build_figure)
+        self._traces = lru_cache(maxsize=maxsize)(self._build_traces)
+
+    def figure(self, visible_layer, highlighted=None, tiles=DEFAULT_TILES, totals=None, points=None,
+               colorscale=FREQUENCY_COLORSCALE):
+        # highlighted maps a layer name to the region ids drawn red in that layer;
+        # totals maps it to a value per region instead, drawn on colorscale.
+        # points are PointIndex clusters, shown when visible_layer is 'point'
+        tiles = tuple(tuple(tile) for tile in tiles)
+        if totals is not None or points is not None:
+            return self._build_figure(visible_layer, (), tiles, totals, points, colorscale)
+        highlighted = tuple(
+            (name, tuple(sorted(int(region_id) for region_id in region_ids)))
+            for name, region_ids in sorted((highlighted or {}).items())
+        )
+        return self._figure(visible_layer, highlighted, tiles)
+
+    def visibility_patch(self, visible_layer, tiles=DEFAULT_TILES, points=None):
+        # Switches the shown layer of a figure built for the same tiles. The
+        # point trace comes after the region traces
+        traces = self._traces(tuple(tuple(tile) for tile in tiles))
+        patch = Patch()
+        for index, (layer_name, _, _) in enumerate(traces):
+            patch['data'][index]['visible'] = layer_name == visible_layer
+        patch['data'][len(traces)]['visible'] = visible_layer == 'point'
+        if points is not None:
+            for key, value in _point_properties(points).items():
+                patch['data'][len(traces)][key] = value
+        return patch
+
+    def colour_patch(self, highlighted=None, tiles=DEFAULT_TILES, totals=None, points=None,
+                     colorscale=FREQUENCY_COLORSCALE):
+        # Recolours a figure built for the same tiles, geometry and hover text
+        # untouched; points re-clusters the point trace
+        tiles = tuple(tuple(tile) for tile in tiles)
+        highlighted = {name: set(region_ids) for name, region_ids in (highlighted or {}).items()}
+        patch = Patch()
+        for index, trace in enumerate(self._trace_colours(highlighted, tiles, totals, colorscale)):
+            for key, value in trace.items():
+                patch['data'][index][key] = value
+        if points is not None:
+            for key, value in _point_properties(points).items():
+                patch['data'][len(self._traces(tiles))][key] = value
+        return patch
+
+    def delta_patch(self, before, after, tiles=DEFAULT_TILES):
+        # Moves a figure showing the 'before' highlight to 'after', both
+        # {layer: boolean vector over regions}, assigning only the z values
+        # that change
+        patch = Patch()
+        for index, (layer_name, _, locations) in enumerate(self._traces(tuple(tuple(tile) for tile in tiles))):
+            changed = np.flatnonzero(before[layer_name][locations] != after[layer_name][locations])
+            # Past a quarter of the trace, the whole vector is smaller than the edits
+            if len(changed) * 4 > len(locations):
+                patch['data'][index]['z'] = after[layer_name][locations].astype(int).tolist()
+                continue
+            for position in changed.tolist():
+                patch['data'][index]['z'][position] = int(after[layer_name][locations[position]])
+        return patch
+
+    def cache_info(self):
+        return self._figure.cache_info()
+
+    def _build_traces(self, tiles):
+        # (layer, tile, locations) of every trace, in figure order
+        traces = []
+        for layer in self.layers.values():
+            drawn = set()
+            for tile in tiles:
+                # A polygon spanning several tiles is drawn from the first one only
+                locations = [i for i in layer.tile_ids(*tile) if i not in drawn]
+                drawn.update(locations)
+                if locations:
+                    traces.append((layer.name, tile, locations))
+        return traces
+
+    def _trace_colours(self, highlighted, tiles, totals=None, colorscale=FREQUENCY_COLORSCALE):
+        # z and colour scale of every trace. The scale of a layer spans its
+        # largest total anywhere, so adjacent tiles agree on colours
+        colours = []
+        coloured_layers = set()
+        for layer_name, _, locations in self._traces(tiles):
+            if totals is None:
+                layer_highlighted = highlighted.get(layer_name, set())
+                colours.append({
+                    'z': [int(i in layer_highlighted) for i in locations],
+                    'zmax': 1,
+                    'colorscale': MAP_COLORSCALE,
+                    'showscale': False,
+                })
+                continue
+            layer_totals = totals[layer_name]
+            colours.append({
+                'z': layer_totals[locations].tolist(),
+                'zmax': max(float(layer_totals.max()), 1.0),
+                'colorscale': colorscale,
+                # One colour bar per layer, hidden along with the layer
+                'showscale': layer_name not in coloured_layers,
+            })
+            coloured_layers.add(layer_name)
+        return colours
+
+    def _build_figure(self, visible_layer, highlighted, tiles, totals=None, points=None,
+                      colorscale=FREQUENCY_COLORSCALE):
+        highlighted = {name: set(region_ids) for name, region_ids in highlighted}
+
+        fig = go.Figure()
+        traces = self._traces(tiles)
+        for (layer_name, tile, locations), colours in zip(traces, self._trace_colours(highlighted, tiles, totals, colorscale)):
+            layer = self.layers[layer_name]
+            fig.add_trace(go.Choroplethmapbox(
+                geojson=layer.tile_url(*tile),
+                locations=locations,
+                zmin=0,
+                hovertext=layer.hover_names[locations],
+                hovertemplate='<b>%{hovertext}</b><extra></extra>',
+                marker={'opacity': 0.6},
+                meta=layer_name,
+                visible=layer_name == visible_layer,
+                **colours,
+            ))
+        fig.add_trace(go.Scattermapbox(
+            mode='markers',
+            hovertemplate='%{text} events<extra></extra>',
+            meta='point',
+            visible=visible_layer == 'point',
+            **_point_properties(points),
+        ))
+        fig.update_layout(
+            mapbox_style="carto-positron",
+            mapbox_center=MAP_CENTER,
+            mapbox_zoom=MAP_ZOOM,
+            margin={"r": 0, "t": 0, "l": 0, "b": 0},
+            showlegend=False,
+            # Keep the user's pan/zoom when the figure is swapped for other tiles
+            uirevision='map',
+        )
+        return fig.to_plotly_json()
+
+
+def register_tile_routes(server, layers):
+    layers = {layer.name: layer for layer in layers}
+
+    @server.route('/tiles/<name>/<int:z>/<int:x>/<int:y>.json')
+    def serve_tile(name, z, x, y):
+        layer = layers.get(name)
+        if (layer is None or not MIN_TILE_ZOOM <= z <= MAX_TILE_ZOOM or max(x, y) >= 2 ** z
+                or not tile_in_india(z, x, y)):
+            abort(404)
+        response = Response(layer.tile(z, x, y), mimetype='application/json')
+        response.add_etag()
+        response.cache_control.public = True
+        response.cache_control.max_age = 86400
+        return response.make_conditional(request)
@@ -0,0 +1,233 @@
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+import plotly
+from dash.exceptions import PreventUpdate
+from flask import Response
+
+# Opt-in callback instrumentation. With FLOOD_METRICS=1 every instrumented
+# callback records its duration, per-stage timings and response payload size,
+# served in Prometheus text format at /metrics. Metrics are per process, so
+# under gunicorn each scrape reports the worker that answered it (labelled
+# with its pid).
+#
+# FLOOD_PROFILE=1 additionally runs a sampling profiler over instrumented
+# callbacks and keeps the collapsed stacks of the FLOOD_PROFILE_KEEP slowest
+# calls in FLOOD_PROFILE_DIR, one .folded file per call, ready for
+# flamegraph.pl or speedscope.
+ENABLED = os.environ.get('FLOOD_METRICS') == '1'
+PROFILE = ENABLED and os.environ.get('FLOOD_PROFILE') == '1'
+PROFILE_DIR = os.environ.get('FLOOD_PROFILE_DIR', 'cache/profiles')
+PROFILE_KEEP = int(os.environ.get('FLOOD_PROFILE_KEEP', '10'))
+PROFILE_INTERVAL = 0.005
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_local = threading.local()
+_lock = threading.Lock()
+
+
+class Registry:
+    def __init__(self):
+        self.buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+        self.duration_sum = Counter()
+        self.calls = Counter()
+        self.errors = Counter()
+        self.prevented = Counter()
+        self.stage_sum = Counter()
+        self.stage_calls = Counter()
+        self.payload_sum = Counter()
+        self.payload_calls = Counter()
+
+    def observe_call(self, callback, seconds, payload_bytes=None, error=False, prevented=False):
+        with _lock:
+            buckets = self.buckets[callback]
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    buckets[index] += 1
+            self.duration_sum[callback] += seconds
+            self.calls[callback] += 1
+            if error:
+                self.errors[callback] += 1
+            if prevented:
+                self.prevented[callback] += 1
+            if payload_bytes is not None:
+                self.payload_sum[callback] += payload_bytes
+                self.payload_calls[callback] += 1
+
+    def observe_stage(self, callback, stage_name, seconds):
+        with _lock:
+            self.stage_sum[callback, stage_name] += seconds
+            self.stage_calls[callback, stage_name] += 1
+
+    def render(self):
+        pid = os.getpid()
+        lines = [
+            '# HELP flood_callback_duration_seconds Time spent in Dash callbacks.',
+            '# TYPE flood_callback_duration_seconds histogram',
+        ]
+        with _lock:
+            for callback, buckets in sorted(self.buckets.items()):
+                labels = f'callback="{callback}",pid="{pid}"'
+                for bound, count in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f'flood_callback_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'flood_callback_duration_seconds_bucket{{{labels},le="+Inf"}} {self.calls[callback]}')
+                lines.append(f'flood_callback_duration_seconds_sum{{{labels}}} {self.duration_sum[callback]:.6f}')
+                lines.append(f'flood_callback_duration_seconds_count{{{labels}}} {self.calls[callback]}')
+
+            lines.append('# HELP flood_callback_errors_total Callbacks that raised an exception.')
+            lines.append('# TYPE flood_callback_errors_total counter')
+            for callback in sorted(self.calls):
+                lines.append(f'flood_callback_errors_total{{callback="{callback}",pid="{pid}"}} '
+                             f'{self.errors[callback]}')
+
+            lines.append('# HELP flood_callback_prevented_total Callbacks that skipped the update (PreventUpdate).')
+            lines.append('# TYPE flood_callback_prevented_total counter')
+            for callback in sorted(self.calls):
+                lines.append(f'flood_callback_prevented_total{{callback="{callback}",pid="{pid}"}} '
+                             f'{self.prevented[callback]}')
+
+            lines.append('# HELP flood_callback_stage_seconds Time spent in each stage of a callback.')
+            lines.append('# TYPE flood_callback_stage_seconds summary')
+            for (callback, stage_name), total in sorted(self.stage_sum.items()):
+                labels = f'callback="{callback}",stage="{stage_name}",pid="{pid}"'
+                lines.append(f'flood_callback_stage_seconds_sum{{{labels}}} {total:.6f}')
+                lines.append(f'flood_callback_stage_seconds_count{{{labels}}} '
+                             f'{self.stage_calls[callback, stage_name]}')
+
+            lines.append('# HELP flood_callback_payload_bytes Size of the JSON callback response.')
+            lines.append('# TYPE flood_callback_payload_bytes summary')
+            for callback, total in sorted(self.payload_sum.items()):
+                labels = f'callback="{callback}",pid="{pid}"'
+                lines.append(f'flood_callback_payload_bytes_sum{{{labels}}} {total}')
+                lines.append(f'flood_callback_payload_bytes_count{{{labels}}} {self.payload_calls[callback]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class Sampler:
+    # Samples the stacks of threads currently inside an instrumented callback
+    def __init__(self, interval=PROFILE_INTERVAL, keep=PROFILE_KEEP, directory=PROFILE_DIR):
+        self.interval = interval
+        self.keep = keep
+        self.directory = directory
+        self.active = {}
+        self.slowest = []
+        self._thread = None
+
+    def _ensure_running(self):
+        # Started lazily so a preloading gunicorn master does not fork a dead thread
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='flood-sampler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with _lock:
+                for thread_id, stacks in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[_collapse(frame)] += 1
+
+    def begin(self):
+        with _lock:
+            self.active[threading.get_ident()] = Counter()
+        self._ensure_running()
+
+    def end(self, callback, seconds):
+        with _lock:
+            stacks = self.active.pop(threading.get_ident(), None)
+            if not stacks:
+                return
+            if len(self.slowest) >= self.keep and seconds <= self.slowest[0][0]:
+                return
+            path = os.path.join(self.directory, f'{callback}-{os.getpid()}-{int(seconds * 1000)}ms-{time.time_ns()}.folded')
+            heapq.heappush(self.slowest, (seconds, path))
+            dropped = heapq.heappop(self.slowest)[1] if len(self.slowest) > self.keep else None
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, 'w') as f:
+            f.writelines(f'{stack} {count}\n' for stack, count in stacks.items())
+        if dropped and os.path.exists(dropped):
+            os.remove(dropped)
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+sampler = Sampler() if PROFILE else None
+
+
+@contextmanager
+def stage(name):
+    # Times a block inside an instrumented callback; free when metrics are off
+    callback = getattr(_local, 'callback', None)
+    if not ENABLED or callback is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe_stage(callback, name, time.perf_counter() - start)
+
+
+def instrument(callback):
+    # Decorator for Dash callbacks; returns the function untouched unless enabled
+    def decorator(function):
+        if not ENABLED:
+            return function
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            _local.callback = callback
+            if sampler:
+                sampler.begin()
+            start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except PreventUpdate:
+                # Nothing to update (e.g. a pan within the same tiles), not a failure
+                registry.observe_call(callback, time.perf_counter() - start, prevented=True)
+                raise
+            except BaseException:
+                registry.observe_call(callback, time.perf_counter() - start, error=True)
+                raise
+            finally:
+                seconds = time.perf_counter() - start
+                _local.callback = None
+                if sampler:
+                    sampler.end(callback, seconds)
+
+            # Serialising again to size the response is the main cost of metrics
+            payload = json.dumps(result, cls=plotly.utils.PlotlyJSONEncoder)
+            registry.observe_call(callback, seconds, len(payload.encode('utf-8')))
+            return result
+        return wrapper
+    return decorator
+
+
+def register_metrics_route(server):
+    if not ENABLED:
+        return
+
+    @server.route('/metrics')
+    def serve_metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
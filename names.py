@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+
+# Persisted spelling -> shapefile row lookup, built once and reused across restarts
+NAME_TABLE_PATH = 'src/name_resolution.json'
+# Threads scoring spellings against shapefile names, -1 for one per core
+MATCH_WORKERS = -1
+
+# Historic or partial state names that fuzzy scoring gets wrong
+STATE_ALIASES = {
+    'Madras': 'Tamil Nadu',
+    'Daman': 'Dadra and Nagar Haveli and Daman and Diu',
+    'Diu': 'Dadra and Nagar Haveli and Daman and Diu',
+}
+
+# District names that fuzzy scoring gets wrong, mapped to shapefile names
+DISTRICT_ALIASES = {
+    # Renamed or split districts, by a name the shapefile knows
+    'Ayodhya': 'Faizabad',
+    'Balasore': 'Baleshwar',
+    'Beed': 'Bid',
+    'Bengaluru Urban': 'Bangalore',
+    'Dholpur': 'Dhaulpur',
+    'East Champaran': 'Purba Champaran',
+    'East Singhbhum': 'Purbi Singhbhum',
+    'Hnahthial': 'Lunglei',
+    'Kadapa': 'Y.S.R.',
+    'Khandwa': 'East Nimar',
+    'Khargone': 'West Nimar',
+    'Khawzawl': 'Champhai',
+    'Kutch': 'Kachchh',
+    'Mayiladuthurai': 'Nagapattinam',
+    'Minicoy': 'Lakshadweep',
+    'North East Delhi': 'North East',
+    'North West Delhi': 'North West',
+    'Paschim Medinipur': 'Medinipur West',
+    'Saitual': 'Aizawl',
+    'South East Delhi': 'South East',
+    'South West Delhi': 'South West',
+    'Unakoti': 'Unokoti',
+    'West Champaran': 'Pashchim Champaran',
+    'West Singhbhum': 'Pashchimi Singhbhum',
+    # Inventory typos
+    'Kamrup Metropolitanpolitan': 'Kamrup Metropolitan',
+    'Siddharthnagarnagar': 'Siddharthnagar',
+    'SiddharthnagarNagar': 'Siddharthnagar',
+    # Inventory cells missing the comma between two districts
+    'Bagalkote Ballari': ['Bagalkote', 'Ballari'],
+    'Bagalkote Udupi': ['Bagalkote', 'Udupi'],
+    'BagalkoteBijapur': ['Bagalkote', 'Vijayapura'],
+    'Chamarajanagara  Kalaburagi': ['Chamarajanagara', 'Kalaburagi'],
+    'Chamarajanagara Chikkaballapura': ['Chamarajanagara', 'Chikkaballapura'],
+    'Chamarajanagara Chitradurga': ['Chamarajanagara', 'Chitradurga'],
+    'Chamarajanagara Davanagere': ['Chamarajanagara', 'Davanagere'],
+    'Chamarajanagara Gadag': ['Chamarajanagara', 'Gadag'],
+    'Chamarajanagara Hassan': ['Chamarajanagara', 'Hassan'],
+    'East & West Purba Medinipur': ['Purba Medinipur', 'Medinipur West'],
+    'Ernakulam Kannur': ['Ernakulam', 'Kannur'],
+    'Ernakulam ant Thiruvananthapuram': ['Ernakulam', 'Thiruvananthapuram'],
+    'Jodhpur & Nagaur': ['Jodhpur', 'Nagaur'],
+    'Kokrajhar Darrang': ['Kokrajhar', 'Darrang'],
+    'Kollam Kozhikode': ['Kollam', 'Kozhikode'],
+    'Sivasagar amd Sonitpur': ['Sivasagar', 'Sonitpur'],
+    'South Salmara Mancachar Tinsukia': ['South Salmara Mancachar', 'Tinsukia'],
+    'Warangal Urban Rural': ['Warangal Urban', 'Warangal Rural'],
+}
+
+
+def split_names(value):
+    # Inventory cells hold comma separated names, empty cells come through as NaN
+    if not isinstance(value, str):
+        return []
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def _fingerprint(names):
+    # Row indices are only valid for the exact shapefile and aliases they were resolved with
+    aliases = json.dumps([STATE_ALIASES, DISTRICT_ALIASES], sort_keys=True)
+    return hashlib.sha1('\n'.join(names + [aliases]).encode('utf-8')).hexdigest()
+
+
+def _alias_rows(spelling, rows_by_name):
+    # Rows of a district alias's shapefile names, None without a usable alias
+    alias = DISTRICT_ALIASES.get(spelling)
+    if alias is None:
+        return None
+    names = [alias] if isinstance(alias, str) else alias
+    rows = [row for name in names for row in rows_by_name.get(name, [])]
+    return rows or None
+
+
+def _best_matches(spellings, candidates):
+    # Best matching candidate name of every spelling (None when nothing
+    # scores), from a single spellings x candidates score matrix. WRatio on
+    # lower-cased alphanumerics, as fuzzywuzzy's extractOne scored them
+    if not spellings or not candidates:
+        return [None] * len(spellings)
+    scores = process.cdist(
+        spellings, candidates, scorer=fuzz.WRatio, processor=utils.default_process, workers=MATCH_WORKERS)
+    best = scores.argmax(axis=1)
+    best_scores = scores[np.arange(len(best)), best]
+    return [candidates[index] if score > 0 else None for index, score in zip(best.tolist(), best_scores.tolist())]
+
+
+def _rows_by_name(names):
+    rows = {}
+    for index, name in enumerate(names):
+        rows.setdefault(name, []).append(index)
+    return rows
+
+
+class NameResolver:
+    def __init__(self, state_names, district_names, district_state_names, path=NAME_TABLE_PATH):
+        self.path = path
+        self.state_names = list(state_names)
+        self.district_names = list(district_names)
+        self._state_candidates = list(dict.fromkeys(self.state_names))
+        self._district_candidates = list(dict.fromkeys(self.district_names))
+        self._state_rows = _rows_by_name(self.state_names)
+        self._district_rows = _rows_by_name(self.district_names)
+        self.fingerprint = _fingerprint(self.state_names + ['|'] + self.district_names)
+        self.states = {}
+        self.districts = {}
+        # Spellings resolved among one state's districts, by state row
+        self.state_districts = {}
+        self._dirty = False
+        self.load()
+
+        # Shapefile state of every district row, as a states shapefile row (-1 if unknown)
+        self.district_state = [
+            (self.resolve_state(name) or [-1])[0] for name in district_state_names
+        ]
+        self._district_rows_by_state = {}
+        for row, state_row in enumerate(self.district_state):
+            self._district_rows_by_state.setdefault(state_row, {}).setdefault(self.district_names[row], []).append(row)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            table = json.load(f)
+        if table.get('fingerprint') != self.fingerprint:
+            return
+        # Merged, so reloading picks up spellings resolved by another process
+        self.states.update(table['states'])
+        self.districts.update(table['districts'])
+        for state_row, districts in table.get('state_districts', {}).items():
+            self.state_districts.setdefault(state_row, {}).update(districts)
+
+    def save(self):
+        if not self._dirty:
+            return
+        table = {
+            'fingerprint': self.fingerprint,
+            'states': self.states,
+            'districts': self.districts,
+            'state_districts': self.state_districts,
+        }
+        # Swapped in whole, running workers may reload the table at any time
+        temporary_path = f'{self.path}.{os.getpid()}'
+        with open(temporary_path, 'w') as f:
+            json.dump(table, f, indent=1, sort_keys=True)
+        os.replace(temporary_path, self.path)
+        self._dirty = False
+
+    def resolve_states(self, spellings):
+        # Shapefile rows of every spelling; new spellings are scored in one batch
+        new = [spelling for spelling in dict.fromkeys(spellings) if spelling not in self.states]
+        fuzzy = []
+        for spelling in new:
+            alias = STATE_ALIASES.get(spelling)
+            if alias in self._state_rows:
+                self.states[spelling] = self._state_rows[alias]
+            else:
+                fuzzy.append(spelling)
+        for spelling, name in zip(fuzzy, _best_matches(fuzzy, self._state_candidates)):
+            self.states[spelling] = self._state_rows.get(name, [])
+        self._dirty = self._dirty or bool(new)
+        return [self.states[spelling] for spelling in spellings]
+
+    def resolve_districts(self, spellings):
+        # Every row carrying the best matching name, since district names repeat
+        # across states; districts_within tells them apart
+        new = [spelling for spelling in dict.fromkeys(spellings) if spelling not in self.districts]
+        fuzzy = []
+        for spelling in new:
+            rows = _alias_rows(spelling, self._district_rows)
+            if rows is None:
+                fuzzy.append(spelling)
+            else:
+                self.districts[spelling] = rows
+        for spelling, name in zip(fuzzy, _best_matches(fuzzy, self._district_candidates)):
+            self.districts[spelling] = self._district_rows.get(name, [])
+        self._dirty = self._dirty or bool(new)
+        return [self.districts[spelling] for spelling in spellings]
+
+    def resolve_districts_within(self, spellings, state_row):
+        # For names whose state is known, like the district dropdown's: rows
+        # of every spelling among that state's districts only, so a name
+        # closer to a district elsewhere still resolves inside its state.
+        # Free-text inventory tokens go through resolve_districts instead
+        table = self.state_districts.setdefault(str(state_row), {})
+        new = [spelling for spelling in dict.fromkeys(spellings) if spelling not in table]
+        rows_by_name = self._district_rows_by_state.get(state_row, {})
+        fuzzy = []
+        for spelling in new:
+            rows = _alias_rows(spelling, rows_by_name)
+            if rows is None:
+                fuzzy.append(spelling)
+            else:
+                table[spelling] = rows
+        for spelling, name in zip(fuzzy, _best_matches(fuzzy, list(rows_by_name))):
+            table[spelling] = rows_by_name.get(name, [])
+        self._dirty = self._dirty or bool(new)
+        return [table[spelling] for spelling in spellings]
+
+    def resolve_state(self, spelling):
+        return self.resolve_states([spelling])[0]
+
+    def resolve_district(self, spelling):
+        return self.resolve_districts([spelling])[0]
+
+    def resolve_names(self, state_spellings, district_spellings):
+        self.resolve_states(list(state_spellings))
+        self.resolve_districts(list(district_spellings))
+        self.save()
+
+    def resolve_state_districts(self, districts_of_states):
+        # Districts listed under their state, like the dropdowns', each
+        # resolved within its own state
+        for state, districts in districts_of_states.items():
+            for state_row in self.resolve_state(state):
+                self.resolve_districts_within(list(districts), state_row)
+        self.save()
+
+    def resolve_frame(self, state_values, district_values):
+        # Resolve every distinct spelling found in the inventory columns
+        self.resolve_names(
+            [spelling for value in state_values for spelling in split_names(value)],
+            [spelling for value in district_values for spelling in split_names(value)],
+        )
+
+    def districts_within(self, spelling, state_rows):
+        # Districts sharing a name (e.g. Aurangabad) are told apart by their state
+        rows = []
+        for state_row in state_rows:
+            rows.extend(self.resolve_districts_within([spelling], state_row)[0])
+        return rows
+
+
+def build_name_resolver(df, states, districts, path=NAME_TABLE_PATH):
+    resolver = NameResolver(
+        states['ST_NM'],
+        districts['Dist_Name'],
+        [name.title() for name in districts['State_Name']],
+        path=path,
+    )
+    resolver.resolve_frame(df['Affected State'], df['Affected District'])
+    return resolver
@@ -0,0 +1,95 @@
+import numpy as np
+import shapely
+
+# Geolocated events are clustered on a web mercator grid: a cluster at map
+# zoom z is a cell CLUSTER_LEVEL_OFFSET levels below the z/x/y tile, i.e.
+# about 64 pixels wide. Points are kept sorted by their Morton (quadtree)
+# code, so every cell at every level is one contiguous slice of that order
+# and both clustering and drill-down are searches, not scans.
+MORTON_BITS = 16
+CLUSTER_LEVEL_OFFSET = 2
+
+
+def _spread_bits(values):
+    # Interleaves zeros between the low 16 bits: abcd -> 0a0b0c0d
+    values = values.astype(np.uint32) & 0xFFFF
+    values = (values | (values << 8)) & 0x00FF00FF
+    values = (values | (values << 4)) & 0x0F0F0F0F
+    values = (values | (values << 2)) & 0x33333333
+    values = (values | (values << 1)) & 0x55555555
+    return values
+
+
+def morton_codes(lon, lat):
+    # Quadtree cell of each point at level MORTON_BITS, y bits above x bits
+    size = 2 ** MORTON_BITS
+    lat = np.clip(lat, -85.0, 85.0)
+    x = np.clip(((lon + 180) / 360 * size).astype(np.int64), 0, size - 1)
+    y = np.clip(((1 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2 * size).astype(np.int64), 0, size - 1)
+    return (_spread_bits(y) << 1) | _spread_bits(x)
+
+
+def locate_points(lon, lat, tree):
+    # Row of the tree polygon containing each point, -1 for missing coordinates
+    # or points outside every polygon, from one bulk STRtree query
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    rows = np.full(len(lon), -1, dtype=np.int64)
+    located = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+    if len(located):
+        point_index, polygon = tree.query(shapely.points(lon[located], lat[located]), predicate='within')
+        # A point on a shared border goes to the lowest polygon row
+        order = np.lexsort((polygon, point_index))
+        point_index, polygon = point_index[order], polygon[order]
+        first = np.flatnonzero(np.r_[True, point_index[1:] != point_index[:-1]]) if len(point_index) else []
+        rows[located[point_index[first]]] = polygon[first]
+    return rows
+
+
+def cluster_level(zoom):
+    return min(MORTON_BITS, max(0, int(zoom) + CLUSTER_LEVEL_OFFSET))
+
+
+class PointIndex:
+    # Events with both coordinates, sorted by Morton code
+    def __init__(self, lon, lat):
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        located = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+        codes = morton_codes(lon[located], lat[located])
+        order = np.argsort(codes, kind='stable')
+        self.codes = codes[order].astype(np.int64)
+        self.ids = located[order]
+        self.lon = lon[self.ids]
+        self.lat = lat[self.ids]
+        self.n_events = len(lon)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def clusters(self, zoom, event_ids=None):
+        # One cluster per occupied cell for the events in event_ids (all when
+        # None): cell, event count and mean position
+        level = cluster_level(zoom)
+        keep = np.ones(len(self.ids), dtype=bool)
+        if event_ids is not None:
+            wanted = np.zeros(self.n_events, dtype=bool)
+            wanted[event_ids] = True
+            keep = wanted[self.ids]
+        cells = self.codes[keep] >> (2 * (MORTON_BITS - level))
+        # Sorted codes give sorted cells, so runs of equal cells are the clusters
+        starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]]) if len(cells) else np.array([], dtype=np.int64)
+        counts = np.diff(np.r_[starts, len(cells)])
+        return {
+            'level': level,
+            'cells': cells[starts],
+            'counts': counts,
+            'lon': np.add.reduceat(self.lon[keep], starts) / counts if len(starts) else self.lon[:0],
+            'lat': np.add.reduceat(self.lat[keep], starts) / counts if len(starts) else self.lat[:0],
+        }
+
+    def cell_events(self, level, cell):
+        # Sorted ids of the events in one cluster cell, via a range search on the codes
+        shift = 2 * (MORTON_BITS - level)
+        first, last = np.searchsorted(self.codes, [cell << shift, (cell + 1) << shift])
+        return np.sort(self.ids[first:last])
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+from store import REGION_MEASURES
+
+# The trend chart is answered from a dense cube of event measures by start
+# year x month x state x cause group, built once at load time. Main Cause is
+# free text with hundreds of spellings, so it is bucketed into a few groups
+# by the first matching pattern; anything else, or no cause, is 'Other'.
+CAUSE_GROUPS = [
+    ('Cloudburst', r'cloud ?burst'),
+    ('Landslide', r'landslide|land slide|landslip'),
+    ('Flash Flood', r'flash'),
+    ('Heavy Rain', r'rain|monsoon'),
+    ('River Flood', r'flood|flodd|river|spate|tributar|brahmaputra|ganga'),
+]
+OTHER_CAUSE = 'Other'
+CAUSE_NAMES = [name for name, _ in CAUSE_GROUPS] + [OTHER_CAUSE]
+MEASURE_NAMES = list(REGION_MEASURES)
+
+
+def cause_groups(causes):
+    # Cause group index of every value of a categorical Main Cause column,
+    # classified once per category rather than once per event
+    categories = pd.Series(causes.categories, dtype=object).str.lower()
+    groups = np.full(len(categories) + 1, len(CAUSE_GROUPS), dtype=np.int64)
+    unmatched = np.ones(len(categories), dtype=bool)
+    for index, (_, pattern) in enumerate(CAUSE_GROUPS):
+        matched = unmatched & categories.str.contains(pattern, regex=True).to_numpy()
+        groups[:-1][matched] = index
+        unmatched &= ~matched
+    # Code -1 (missing) picks the trailing 'Other'
+    return groups[np.asarray(causes.codes, dtype=np.int64)]
+
+
+class RollupCube:
+    # values[month, state, cause, measure], months counted from January of
+    # first_year. The last state slot holds every event once, so totals
+    # without a state filter do not count multi-state events twice. Events
+    # without a start date cannot be placed and are left out
+    def __init__(self, values, first_year):
+        self.values = values
+        self.first_year = first_year
+
+    @classmethod
+    def from_store(cls, store, ids=None):
+        # With ids, a cube of those events alone with only the 'all' slot: a
+        # subset is never filtered by state, so the bincounts stay its size
+        dated = ~np.isnat(store.start)
+        months = store.start[dated].astype('datetime64[M]').astype(np.int64)
+        first_year = int(months.min() // 12 + 1970) if len(months) else 1970
+        last_year = int(months.max() // 12 + 1970) if len(months) else 1970
+
+        if ids is None:
+            # One entry per event in the 'all' slot plus one per affected state
+            n_states = store.event_states.n_cols
+            events = np.concatenate([np.arange(len(store)), store.event_states.row_ids()])
+            states = np.concatenate([np.full(len(store), n_states), store.event_states.indices])
+        else:
+            n_states = 0
+            events = np.asarray(ids, dtype=np.int64)
+            states = np.zeros(len(events), dtype=np.int64)
+        keep = dated[events]
+        events, states = events[keep], states[keep]
+        months = store.start[events].astype('datetime64[M]').astype(np.int64) - (first_year - 1970) * 12
+        causes = cause_groups(store.cause[events])
+
+        shape = ((last_year - first_year + 1) * 12, n_states + 1, len(CAUSE_NAMES))
+        flat = np.ravel_multi_index((months, states, causes), shape)
+        values = np.zeros(shape + (len(MEASURE_NAMES),), dtype=np.float64)
+        for index, column in enumerate(REGION_MEASURES.values()):
+            weights = None if column is None else np.nan_to_num(store.frame[column].to_numpy()[events])
+            values[..., index] = np.bincount(flat, weights=weights, minlength=int(np.prod(shape))).reshape(shape)
+        return cls(values, first_year)
+
+    def _month(self, value, default):
+        if not value:
+            return default
+        month = np.datetime64(value, 'M').astype(np.int64) - (self.first_year - 1970) * 12
+        return int(np.clip(month, -1, len(self.values)))
+
+    def series(self, measure='count', start_date=None, end_date=None, state_rows=None, period='year'):
+        # (period labels, cause x period totals) for events starting in the
+        # months from start_date's to end_date's, in the given states (all
+        # when None; an event in several of them counts once per state).
+        # A slice and a sum over the cube, no event is visited
+        first = max(self._month(start_date, 0), 0)
+        last = min(self._month(end_date, len(self.values) - 1), len(self.values) - 1)
+        slots = [self.values.shape[1] - 1] if state_rows is None else list(state_rows)
+        months = self.values[first:last + 1, :, :, MEASURE_NAMES.index(measure)][:, slots].sum(axis=1)
+        month_numbers = np.arange(first, last + 1) + (self.first_year - 1970) * 12
+        if len(months) == 0:
+            return [], np.zeros((len(CAUSE_NAMES), 0))
+
+        if period == 'month':
+            labels = [str(month) for month in month_numbers.astype('datetime64[M]')]
+            return labels, months.T
+        years = month_numbers // 12 + 1970
+        starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+        return [str(year) for year in years[starts]], np.add.reduceat(months, starts, axis=0).T
+
+
+class RegionTimeline:
+    # Which regions had an event going on in each year, as a years x regions
+    # boolean matrix per layer. An event is active in every year from its
+    # start to its end date
+    def __init__(self, first_year, active):
+        self.first_year = first_year
+        self.active = active
+
+    @classmethod
+    def from_store(cls, store):
+        dated = ~np.isnat(store.start)
+        start_years = store.start.astype('datetime64[Y]').astype(np.int64) + 1970
+        end = np.where(np.isnat(store.end), store.start, store.end)
+        end_years = np.maximum(end.astype('datetime64[Y]').astype(np.int64) + 1970, start_years)
+        first_year = int(start_years[dated].min()) if dated.any() else 1970
+        last_year = int(end_years[dated].max()) if dated.any() else 1970
+
+        active = {}
+        for layer, incidence in [('state', store.event_states), ('district', store.event_districts)]:
+            events = incidence.row_ids()
+            keep = dated[events]
+            events, regions = events[keep], incidence.indices[keep]
+            # One entry per year of each (event, region) pair
+            spans = end_years[events] - start_years[events] + 1
+            offsets = np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+            years = np.repeat(start_years[events] - first_year, spans) + offsets
+            matrix = np.zeros((last_year - first_year + 1, incidence.n_cols), dtype=bool)
+            matrix[years, np.repeat(regions, spans)] = True
+            active[layer] = matrix
+        return cls(first_year, active)
+
+    @property
+    def last_year(self):
+        return self.first_year + len(self.active['state']) - 1
+
+    def regions(self, year):
+        # {layer: boolean vector over regions} of the events active in a year
+        index = min(max(int(year) - self.first_year, 0), len(self.active['state']) - 1)
+        return {layer: matrix[index] for layer, matrix in self.active.items()}
@@ -0,0 +1,322 @@
+import copy
+
+import numpy as np
+import pandas as pd
+from shapely import STRtree
+
+from names import split_names
+from points import PointIndex, locate_points
+
+INVENTORY_PATH = 'src/IndiaFloodInventory.csv'
+DATE_FORMAT = '%d/%m/%Y'
+
+# Inventory column -> column name shown in the table
+INVENTORY_COLUMNS = {
+    'Start': 'Start Date',
+    'End': 'End Date',
+    'Duration(Days)': 'Duration (in days)',
+    'Main Cause': 'Main Cause',
+    'State': 'Affected State',
+    'Districts': 'Affected District',
+    'Human fatality': 'Human Fatalities',
+    'Latitude': 'Latitude',
+    'Longitude': 'Longitude',
+}
+DATE_COLUMNS = ['Start Date', 'End Date']
+# Coordinates only feed the point layer, the table shows the rest
+COORDINATE_COLUMNS = ['Latitude', 'Longitude']
+DISPLAY_COLUMNS = [column for column in INVENTORY_COLUMNS.values() if column not in COORDINATE_COLUMNS]
+
+# What a region can be coloured by on the map: events are counted, or a
+# column summed over them (missing values count as 0)
+REGION_MEASURES = {
+    'count': None,
+    'duration': 'Duration (in days)',
+    'fatalities': 'Human Fatalities',
+}
+
+
+def read_inventory(path=INVENTORY_PATH):
+    # Included the columns before reading the CSV file to reduce loading time
+    frame = pd.read_csv(path, usecols=list(INVENTORY_COLUMNS))
+    frame = frame.rename(columns=INVENTORY_COLUMNS)[list(INVENTORY_COLUMNS.values())]
+
+    # Dates stay datetime64 so filtering compares dates, not DD/MM/YYYY strings
+    for column in DATE_COLUMNS:
+        frame[column] = pd.to_datetime(frame[column], format=DATE_FORMAT)
+    frame['Duration (in days)'] = frame['Duration (in days)'].astype('float64')
+    for column in ['Human Fatalities'] + COORDINATE_COLUMNS:
+        frame[column] = pd.to_numeric(frame[column], errors='coerce')
+    frame['Main Cause'] = frame['Main Cause'].astype('category')
+    return frame
+
+
+def encode_name_lists(values, vocabulary=None):
+    # CSR style encoding of the comma separated name cells: the names of row i
+    # are vocabulary[codes[offsets[i]:offsets[i + 1]]]. An existing name -> code
+    # vocabulary is extended in place, so appended rows reuse its codes
+    vocabulary = {} if vocabulary is None else vocabulary
+    offsets = [0]
+    codes = []
+    for value in values:
+        for name in split_names(value):
+            codes.append(vocabulary.setdefault(name, len(vocabulary)))
+        offsets.append(len(codes))
+    return (
+        np.array(list(vocabulary), dtype=object),
+        np.array(offsets, dtype=np.int64),
+        np.array(codes, dtype=np.int32),
+    )
+
+
+class Incidence:
+    # Sparse 0/1 matrix in CSR form: the columns set in row i are
+    # indices[offsets[i]:offsets[i + 1]], always sorted and unique
+    def __init__(self, offsets, indices, n_cols):
+        self.offsets = offsets
+        self.indices = indices
+        self.n_cols = n_cols
+
+    @classmethod
+    def from_pairs(cls, rows, cols, n_rows, n_cols):
+        keys = np.unique(rows.astype(np.int64) * n_cols + cols)
+        rows, cols = np.divmod(keys, n_cols)
+        offsets = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=offsets[1:])
+        return cls(offsets, cols.astype(np.int32), n_cols)
+
+    @classmethod
+    def from_lists(cls, lists, n_cols):
+        rows = np.repeat(np.arange(len(lists)), [len(items) for items in lists])
+        cols = np.fromiter((item for items in lists for item in items), dtype=np.int64, count=len(rows))
+        return cls.from_pairs(rows, cols, len(lists), n_cols)
+
+    @property
+    def n_rows(self):
+        return len(self.offsets) - 1
+
+    def row(self, i):
+        return self.indices[self.offsets[i]:self.offsets[i + 1]]
+
+    def to_json(self):
+        # Plain lists for a dcc.Store; the browser slices indices with offsets
+        return {'offsets': self.offsets.tolist(), 'indices': self.indices.tolist()}
+
+    def row_ids(self):
+        # Row number of every stored entry, aligned with indices
+        return np.repeat(np.arange(self.n_rows), np.diff(self.offsets))
+
+    def union(self, rows):
+        # Sorted union of several rows
+        if len(rows) == 1:
+            return self.row(rows[0])
+        return np.unique(np.concatenate([self.row(i) for i in rows] or [self.indices[:0]]))
+
+    def transpose(self):
+        return Incidence.from_pairs(self.indices, self.row_ids(), self.n_cols, self.n_rows)
+
+    def append_rows(self, other):
+        # The rows of other below this matrix's rows
+        return Incidence(
+            np.concatenate([self.offsets, other.offsets[1:] + self.offsets[-1]]),
+            np.concatenate([self.indices, other.indices]),
+            self.n_cols,
+        )
+
+    def extend_rows(self, other, shift):
+        # Row i followed by other's row i with shift added to its columns. Every
+        # shifted column must be past this matrix's, so rows stay sorted
+        offsets = self.offsets + other.offsets
+        indices = np.empty(len(self.indices) + len(other.indices), dtype=self.indices.dtype)
+        rows = self.row_ids()
+        indices[np.arange(len(self.indices)) - self.offsets[rows] + offsets[rows]] = self.indices
+        rows = other.row_ids()
+        positions = np.arange(len(other.indices)) - other.offsets[rows] + offsets[rows] + np.diff(self.offsets)[rows]
+        indices[positions] = other.indices + shift
+        return Incidence(offsets, indices, shift + other.n_cols)
+
+    def expand(self, codes):
+        # Replace each code in a flat array by its row, returning the position
+        # of the code each resulting entry came from alongside the entries
+        counts = np.diff(self.offsets)[codes]
+        source = np.repeat(np.arange(len(codes)), counts)
+        starts = np.repeat(self.offsets[codes] - np.cumsum(counts) + counts, counts)
+        return source, self.indices[starts + np.arange(len(source))]
+
+    def column_totals(self, rows, weights=None):
+        # Sparse vector-matrix product: sum over the given rows of weight * row,
+        # one total per column. Unweighted, it counts the rows touching each column
+        source, columns = self.expand(rows)
+        if weights is not None:
+            weights = np.nan_to_num(np.asarray(weights, dtype=np.float64)[rows][source])
+        return np.bincount(columns, weights=weights, minlength=self.n_cols).astype(np.float64)
+
+
+def format_for_display(frame):
+    # Dates are only turned back into DD/MM/YYYY strings when rows are rendered
+    frame = frame[DISPLAY_COLUMNS].copy()
+    for column in DATE_COLUMNS:
+        frame[column] = frame[column].dt.strftime(DATE_FORMAT)
+    return frame
+
+
+class FloodStore:
+    def __init__(self, frame):
+        # Renumbering copies every column, so a frame already numbered from 0
+        # (like the dataset cache's) keeps its memory-mapped columns
+        if not frame.index.equals(pd.RangeIndex(len(frame))):
+            frame = frame.reset_index(drop=True)
+        self.frame = frame
+        self.state_names, self.state_offsets, self.state_codes = encode_name_lists(
+            self.frame['Affected State'])
+        self.district_names, self.district_offsets, self.district_codes = encode_name_lists(
+            self.frame['Affected District'])
+        self._read_columns()
+        # Bumped by every append, for caches of anything derived from the events
+        self.version = 0
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _read_columns(self):
+        self.start = self.frame['Start Date'].to_numpy()
+        self.end = self.frame['End Date'].to_numpy()
+        self.duration = self.frame['Duration (in days)'].to_numpy()
+        self.cause = self.frame['Main Cause'].array
+        self.points = PointIndex(self.frame['Longitude'], self.frame['Latitude'])
+
+    def _event_regions(self, first, resolver):
+        # Event -> shapefile region incidence of the events from first onwards,
+        # numbered from 0
+        n_events = len(self) - first
+        spellings = Incidence.from_lists(
+            resolver.resolve_states(list(self.state_names)), len(resolver.state_names))
+        token_event = np.repeat(np.arange(n_events), np.diff(self.state_offsets[first:]))
+        source, regions = spellings.expand(self.state_codes[self.state_offsets[first]:])
+        event_states = Incidence.from_pairs(
+            token_event[source], regions, n_events, len(resolver.state_names))
+
+        # A district only counts when it lies in one of the event's affected states
+        spellings = Incidence.from_lists(
+            resolver.resolve_districts(list(self.district_names)), len(resolver.district_names))
+        token_event = np.repeat(np.arange(n_events), np.diff(self.district_offsets[first:]))
+        source, regions = spellings.expand(self.district_codes[self.district_offsets[first]:])
+        events = token_event[source]
+        # The spare last column keeps districts of unknown state (-1) unmatched
+        in_event_states = np.zeros((n_events, len(resolver.state_names) + 1), dtype=bool)
+        in_event_states[event_states.row_ids(), event_states.indices] = True
+        keep = in_event_states[events, np.asarray(resolver.district_state)[regions]]
+        events, regions = events[keep], regions[keep]
+
+        # Events without a named district fall back to the district containing
+        # their coordinates, which also gives them a state if they had none
+        if self._district_tree is not None:
+            located = locate_points(
+                self.frame['Longitude'].to_numpy()[first:], self.frame['Latitude'].to_numpy()[first:],
+                self._district_tree)
+            unnamed = np.ones(n_events, dtype=bool)
+            unnamed[events] = False
+            filled = np.flatnonzero(unnamed & (located >= 0))
+            events = np.concatenate([events, filled])
+            regions = np.concatenate([regions, located[filled]])
+            stateless = filled[np.diff(event_states.offsets)[filled] == 0]
+            states = np.asarray(resolver.district_state)[located[stateless]]
+            # Districts of unknown state (-1) leave the event without one
+            stateless, states = stateless[states >= 0], states[states >= 0]
+            if len(stateless):
+                event_states = Incidence.from_pairs(
+                    np.concatenate([event_states.row_ids(), stateless]),
+                    np.concatenate([event_states.indices, states]),
+                    n_events, len(resolver.state_names))
+
+        event_districts = Incidence.from_pairs(events, regions, n_events, len(resolver.district_names))
+        return event_states, event_districts
+
+    def index_regions(self, resolver, district_geometry=None):
+        # Event -> shapefile region incidence and its inverse, region -> sorted event ids.
+        # With the districts' geometry, coordinates fill in missing districts
+        self._district_tree = STRtree(district_geometry) if district_geometry is not None else None
+        self.event_states, self.event_districts = self._event_regions(0, resolver)
+        self.state_events = self.event_states.transpose()
+        self.district_events = self.event_districts.transpose()
+
+    def append(self, frame, resolver):
+        # Adds new events after the existing ones. They are added to a shallow
+        # copy, swapped in with a single assignment: a query in another thread
+        # sees the old events or all of the new ones, and as events are only
+        # ever added, ids it got from the old state stay valid in the new one
+        updated = copy.copy(self)
+        updated._add_events(frame, resolver)
+        self.__dict__ = updated.__dict__
+
+    def _add_events(self, frame, resolver):
+        # Only the new rows are encoded and indexed; as their ids are the
+        # largest, they go at the end of every posting list
+        first = len(self)
+        frame = frame.reset_index(drop=True)
+        combined = pd.concat([self.frame, frame], ignore_index=True)
+        combined['Main Cause'] = pd.api.types.union_categoricals(
+            [self.frame['Main Cause'], frame['Main Cause']])
+
+        names = {}
+        for column, prefix in [('Affected State', 'state'), ('Affected District', 'district')]:
+            vocabulary = {name: code for code, name in enumerate(getattr(self, f'{prefix}_names'))}
+            vocabulary, offsets, codes = encode_name_lists(frame[column], vocabulary)
+            old_offsets = getattr(self, f'{prefix}_offsets')
+            names[prefix] = (
+                vocabulary,
+                np.concatenate([old_offsets, offsets[1:] + old_offsets[-1]]),
+                np.concatenate([getattr(self, f'{prefix}_codes'), codes]),
+            )
+
+        self.frame = combined
+        self.state_names, self.state_offsets, self.state_codes = names['state']
+        self.district_names, self.district_offsets, self.district_codes = names['district']
+        self._read_columns()
+
+        event_states, event_districts = self._event_regions(first, resolver)
+        self.state_events = self.state_events.extend_rows(event_states.transpose(), first)
+        self.district_events = self.district_events.extend_rows(event_districts.transpose(), first)
+        self.event_states = self.event_states.append_rows(event_states)
+        self.event_districts = self.event_districts.append_rows(event_districts)
+        self.version += 1
+
+    def query(self, start_date=None, end_date=None, state_rows=None, district_rows=None, cluster=None):
+        # Sorted ids of matching events. Region filters intersect posting lists
+        # from the inverted index, a point cluster (level, cell) the events
+        # found in it; dates are then only checked on the survivors
+        ids = None
+        if state_rows is not None:
+            ids = self.state_events.union(state_rows)
+        if district_rows is not None:
+            district_ids = self.district_events.union(district_rows)
+            ids = district_ids if ids is None else np.intersect1d(ids, district_ids, assume_unique=True)
+        if cluster is not None:
+            cluster_ids = self.points.cell_events(*cluster)
+            ids = cluster_ids if ids is None else np.intersect1d(ids, cluster_ids, assume_unique=True)
+        if ids is None:
+            ids = np.arange(len(self))
+
+        # Events with a missing date never match a bound
+        if start_date:
+            ids = ids[self.start[ids] >= np.datetime64(start_date)]
+        if end_date:
+            ids = ids[self.end[ids] <= np.datetime64(end_date)]
+        return ids
+
+    def region_totals(self, ids, measure='count'):
+        # Per-region totals of a REGION_MEASURES measure over the given events, for both layers
+        column = REGION_MEASURES[measure]
+        weights = None if column is None else self.frame[column].to_numpy()
+        return {
+            'state': self.event_states.column_totals(ids, weights),
+            'district': self.event_districts.column_totals(ids, weights),
+        }
+
+    def sort(self, ids, column, ascending=True):
+        # Sorts on the typed columns, so dates order chronologically; missing values go last
+        values = self.frame[column].iloc[ids]
+        return values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+
+    def page_ids(self, ids, page_current, page_size):
+        return ids[page_current * page_size:(page_current + 1) * page_size]
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Run from the repository root (python -m pytest), the data paths are relative to it.
+# Results are not memoised, so every test computes what it checks
+os.environ.setdefault('FLOOD_CACHE', 'off')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
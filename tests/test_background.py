@@ -0,0 +1,115 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+# FLOOD_BACKGROUND is read when app is imported, so the background app runs
+# this file as a script in a process of its own and prints its responses
+MAP_OUTPUT = '..map-graph.figure...map-tiles.data...timeline-shown.data..'
+SLOW_ZOOM = 7
+RENDERS = [
+    ('highlight-option.value', {'highlight': 'district'}),
+    ('color-option.value', {'color': 'duration'}),
+    ('map-graph.relayoutData', {'relayout': {'mapbox.center': {'lon': 78, 'lat': 22}, 'mapbox.zoom': 3.3}}),
+    ('map-graph.relayoutData', {'relayout': {'mapbox.center': {'lon': 88, 'lat': 26}, 'mapbox.zoom': 6}}),
+]
+
+
+def map_request(tiles, changed, highlight='state', color='event', relayout=None):
+    values = {'highlight-option': highlight, 'color-option': color, 'table-query': {},
+              'map-graph': relayout, 'select-all': []}
+    return {
+        'output': MAP_OUTPUT,
+        'outputs': [{'id': 'map-graph', 'property': 'figure'}, {'id': 'map-tiles', 'property': 'data'},
+                    {'id': 'timeline-shown', 'property': 'data'}],
+        'inputs': [{'id': component, 'property': 'relayoutData' if component == 'map-graph' else 'value',
+                    'value': value} for component, value in values.items()],
+        'changedPropIds': [changed],
+        'state': [{'id': 'datatable-interactivity', 'property': 'derived_virtual_selected_row_ids', 'value': []},
+                  {'id': 'timeline-year', 'property': 'value', 'value': 2000},
+                  {'id': 'map-tiles', 'property': 'data', 'value': tiles}],
+    }
+
+
+def response_of(response):
+    return response.status_code, response.get_json() if response.status_code == 200 else None
+
+
+def poll(client, body, job, seconds=60):
+    # What the renderer does: ask again until the job's result is in
+    url = f'/_dash-update-component?cacheKey={job["cacheKey"]}&job={job["job"]}'
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        response = client.post(url, json=body)
+        if response.status_code != 200 or 'response' in response.get_json():
+            return response_of(response)
+        time.sleep(0.05)
+    raise TimeoutError(job)
+
+
+def run_background_app():
+    import psutil
+
+    import app
+
+    # Renders at SLOW_ZOOM take long enough to be cancelled
+    figure = app.map_figures.figure
+    def slow_figure(highlight_option, highlighted, tiles, *args):
+        if tiles[0][0] == SLOW_ZOOM:
+            time.sleep(60)
+        return figure(highlight_option, highlighted, tiles, *args)
+    app.map_figures.figure = slow_figure
+
+    client = app.server.test_client()
+    tiles = [list(tile) for tile in app.DEFAULT_TILES]
+    results = []
+    for changed, options in RENDERS:
+        body = map_request(tiles, changed, **options)
+        job = client.post('/_dash-update-component', json=body).get_json()
+        results.append(poll(client, body, job))
+
+    # A newer request names the job it supersedes, which is terminated
+    slow = map_request(tiles, 'map-graph.relayoutData',
+                       relayout={'mapbox.center': {'lon': 88, 'lat': 26}, 'mapbox.zoom': SLOW_ZOOM})
+    slow_job = client.post('/_dash-update-component', json=slow).get_json()
+    changed, options = RENDERS[-1]
+    body = map_request(tiles, changed, **options)
+    job = client.post(f'/_dash-update-component?oldJob={slow_job["job"]}', json=body).get_json()
+    deadline = time.time() + 10
+    while psutil.pid_exists(slow_job['job']) and time.time() < deadline:
+        if psutil.Process(slow_job['job']).status() == psutil.STATUS_ZOMBIE:
+            break
+        time.sleep(0.05)
+    cancelled = poll(client, slow, slow_job, seconds=5)
+    print(json.dumps({'renders': results, 'cancelled': cancelled, 'after_cancel': poll(client, body, job)}))
+
+
+def test_background_renders_match_synchronous_ones():
+    pytest.importorskip('diskcache')
+    pytest.importorskip('multiprocess')
+    pytest.importorskip('psutil')
+    import app
+
+    env = dict(os.environ, FLOOD_BACKGROUND='1', FLOOD_CACHE='off', PYTHONPATH=os.pathsep.join(
+        [os.path.dirname(os.path.dirname(os.path.abspath(__file__))), os.environ.get('PYTHONPATH', '')]))
+    process = subprocess.run([sys.executable, __file__], env=env, capture_output=True, text=True, timeout=300)
+    assert process.returncode == 0, process.stderr
+    background = json.loads(process.stdout.strip().splitlines()[-1])
+
+    client = app.server.test_client()
+    tiles = [list(tile) for tile in app.DEFAULT_TILES]
+    expected = [list(response_of(client.post('/_dash-update-component', json=map_request(tiles, changed, **options))))
+                for changed, options in RENDERS]
+    # Patches, no_update outputs and PreventUpdate (204) all come back as they do without a job
+    assert [status for status, _ in expected] == [200, 200, 204, 200]
+    assert background['renders'] == expected
+    # The superseded job gives no output, the newer one its figure
+    assert background['cancelled'] == [204, None]
+    assert background['after_cancel'] == expected[-1]
+
+
+if __name__ == '__main__':
+    run_background_app()
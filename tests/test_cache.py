@@ -0,0 +1,69 @@
+import pytest
+
+import cache
+from cache import ResultCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Both tiers read time.time, moved on by hand instead of sleeping
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    # Caches of separate workers: their own local tier, one SQLite file
+    def make_cache(version=lambda: 'v1', ttl=60):
+        return ResultCache(version, 'sqlite', ttl, path=str(tmp_path / 'results.sqlite'))
+    return make_cache
+
+
+def counted(result_cache, calls):
+    @result_cache.memoize('double')
+    def double(query):
+        calls.append(query)
+        return 2 * query['a']
+    return double
+
+
+def test_hit_across_instances(make_cache):
+    calls = []
+    assert counted(make_cache(), calls)({'a': 1}) == 2
+    assert counted(make_cache(), calls)({'a': 1}) == 2
+    assert calls == [{'a': 1}]
+
+
+def test_miss_after_version_change(make_cache):
+    calls, version = [], ['v1']
+    double = counted(make_cache(lambda: version[0]), calls)
+    double({'a': 1})
+    version[0] = 'v2'
+    double({'a': 1})
+    assert len(calls) == 2
+    # Another worker on the new version finds the new result
+    counted(make_cache(lambda: version[0]), calls)({'a': 1})
+    assert len(calls) == 2
+
+
+def test_expiry_after_ttl(make_cache, clock):
+    calls = []
+    double = counted(make_cache(ttl=60), calls)
+    double({'a': 1})
+    clock[0] += 59
+    double({'a': 1})
+    assert len(calls) == 1
+    clock[0] += 2
+    double({'a': 1})
+    assert len(calls) == 2
+    # The shared copy has expired too
+    clock[0] += 61
+    counted(make_cache(ttl=60), calls)({'a': 1})
+    assert len(calls) == 3
+
+
+def test_none_entries_give_the_same_key(make_cache):
+    result_cache = make_cache()
+    assert result_cache.key('double', [{'a': 1, 'b': None}]) == result_cache.key('double', [{'a': 1}])
+    assert result_cache.key('double', [{'a': 1}]) != result_cache.key('double', [{'a': 2}])
@@ -0,0 +1,13 @@
+import pytest
+
+from export import query_from_args
+
+
+def test_query_from_args_keeps_given_parameters():
+    assert query_from_args({'state': 'Assam', 'district': '', 'cluster': '5,1'}) == {'state': 'Assam', 'cluster': [5, 1]}
+
+
+@pytest.mark.parametrize('cluster', ['3', 'a,b', '1,2,3', '17,0', '-1,0', '2,16'])
+def test_query_from_args_rejects_bad_clusters(cluster):
+    with pytest.raises(ValueError):
+        query_from_args({'cluster': cluster})
@@ -0,0 +1,25 @@
+import pandas as pd
+
+import app
+from dataset import load_dataset
+from ingest import InventoryFollower, append_inventory
+from store import INVENTORY_PATH, FloodStore
+
+
+def test_follower_picks_up_rows_appended_while_loading(tmp_path):
+    raw = pd.read_csv(INVENTORY_PATH, dtype=str, keep_default_na=False)
+    inventory, new_events = str(tmp_path / 'inventory.csv'), str(tmp_path / 'new_events.csv')
+    raw.iloc[:5000].to_csv(inventory, index=False, lineterminator='\n')
+    raw.iloc[5000:5100].to_csv(new_events, index=False, lineterminator='\n')
+
+    frame, _, _, inventory_size = load_dataset(inventory, cache_dir=str(tmp_path / 'data'))
+    # Ingested while the app is still resolving names and indexing
+    append_inventory(new_events, inventory)
+    store = FloodStore(frame)
+    store.index_regions(app.name_resolver)
+    follower = InventoryFollower(store, app.name_resolver, inventory_size, inventory, poll_seconds=0)
+
+    assert len(store) == 5000
+    assert follower.refresh()
+    assert len(store) == 5100
+    assert not follower.refresh()
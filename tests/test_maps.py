@@ -0,0 +1,52 @@
+import os
+
+import flask
+import pytest
+
+import app
+import maps
+from maps import MapLayer, register_tile_routes, tile_in_india, view_tiles
+
+
+@pytest.fixture
+def tiles(tmp_path):
+    layer = MapLayer('district', app.districts_layer, 'Dist_Name', cache_dir=str(tmp_path))
+    server = flask.Flask(__name__)
+    register_tile_routes(server, [layer])
+    return layer, server.test_client()
+
+
+def cached_files(layer):
+    return [name for _, _, names in os.walk(layer.cache_dir) for name in names]
+
+
+def test_tiles_outside_india_are_not_found(tiles):
+    layer, client = tiles
+    for x in range(50):
+        assert client.get(f'/tiles/district/10/{x}/7.json').status_code == 404
+    assert cached_files(layer) == []
+
+
+def test_only_tiles_with_regions_are_cached(tiles):
+    layer, client = tiles
+    z, x, y = view_tiles()[0]
+    assert client.get(f'/tiles/district/{z}/{x}/{y}.json').status_code == 200
+    assert len(cached_files(layer)) == 1
+    # A tile over India holding no region, the open sea south of Kerala
+    x, y = maps._tile_xy(70.0, 6.5, 10)
+    assert not layer.tile_ids(10, x, y)
+    assert client.get(f'/tiles/district/10/{x}/{y}.json').status_code == 200
+    assert len(cached_files(layer)) == 1
+
+
+def test_views_only_ask_for_tiles_over_india():
+    for relayout_data in [None, {'mapbox.center': {'lon': 20, 'lat': 8}, 'mapbox.zoom': 8},
+                          {'mapbox.center': {'lon': 78, 'lat': 22}, 'mapbox.zoom': 1}]:
+        assert view_tiles(relayout_data)
+        assert all(tile_in_india(*tile) for tile in view_tiles(relayout_data))
+
+
+def test_tile_cache_follows_simplification(monkeypatch):
+    layer = MapLayer('district', app.districts_layer, 'Dist_Name')
+    monkeypatch.setattr(maps, 'SIMPLIFY_TIERS', maps.SIMPLIFY_TIERS[:-1] + [(10, None)])
+    assert MapLayer('district', app.districts_layer, 'Dist_Name').cache_dir != layer.cache_dir
@@ -0,0 +1,40 @@
+import pytest
+
+import app
+from names import DISTRICT_ALIASES
+
+
+def test_dropdown_districts_resolve_inside_their_state():
+    resolver = app.name_resolver
+    for state, districts in app.districts_of_states.items():
+        state_rows = resolver.resolve_state(state)
+        assert state_rows, state
+        for district in districts:
+            rows = resolver.districts_within(district, state_rows)
+            assert rows, (state, district)
+            assert {resolver.district_state[row] for row in rows} <= set(state_rows), (state, district)
+
+
+def test_district_aliases_name_shapefile_districts():
+    district_names = set(app.name_resolver.district_names)
+    for spelling, alias in DISTRICT_ALIASES.items():
+        for name in [alias] if isinstance(alias, str) else alias:
+            assert name in district_names, (spelling, name)
+
+
+@pytest.mark.parametrize('state, district', [
+    ('Assam', 'Kamrup Metropolitan'),
+    ('Uttar Pradesh', 'Siddharthnagar'),
+    ('Maharashtra', 'Beed'),
+    ('Jharkhand', 'East Singhbhum'),
+    ('Tripura', 'Unakoti'),
+])
+def test_filter_keeps_events_naming_the_district(state, district):
+    # Inventory typos of the district (Kamrup Metropolitanpolitan, ...) still match it
+    frame = app.store.frame
+    named = frame.index[
+        frame['Affected State'].str.contains(state, na=False, regex=False)
+        & frame['Affected District'].str.contains(district, na=False, regex=False)
+    ]
+    assert len(named)
+    assert set(named) <= set(app.query_event_ids({'state': state, 'district': district}).tolist())
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from points import MORTON_BITS, PointIndex, cluster_level, morton_codes
+
+
+@pytest.fixture(scope='module')
+def events():
+    # Random events over India, a tenth of them without coordinates
+    rng = np.random.default_rng(7)
+    lon = rng.uniform(68.0, 97.0, 2000)
+    lat = rng.uniform(8.0, 37.0, 2000)
+    lon[rng.random(2000) < 0.1] = np.nan
+    return lon, lat
+
+
+def brute_force_cells(lon, lat, level):
+    # Cell of every located event, scanning them one by one
+    located = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+    return located, morton_codes(lon[located], lat[located]).astype(np.int64) >> (2 * (MORTON_BITS - level))
+
+
+@pytest.mark.parametrize('zoom', [0, 3, 5, 8, 14])
+def test_clusters_match_brute_force(events, zoom):
+    lon, lat = events
+    index = PointIndex(lon, lat)
+    clusters = index.clusters(zoom)
+    located, cells = brute_force_cells(lon, lat, cluster_level(zoom))
+
+    expected_cells, expected_counts = np.unique(cells, return_counts=True)
+    np.testing.assert_array_equal(clusters['cells'], expected_cells)
+    np.testing.assert_array_equal(clusters['counts'], expected_counts)
+    for position in range(0, len(expected_cells), max(1, len(expected_cells) // 20)):
+        members = located[cells == expected_cells[position]]
+        assert clusters['lon'][position] == pytest.approx(lon[members].mean())
+        assert clusters['lat'][position] == pytest.approx(lat[members].mean())
+
+
+@pytest.mark.parametrize('zoom', [0, 4, 9])
+def test_cell_events_match_brute_force(events, zoom):
+    lon, lat = events
+    index = PointIndex(lon, lat)
+    level = cluster_level(zoom)
+    located, cells = brute_force_cells(lon, lat, level)
+    for cell in np.unique(cells)[:50]:
+        np.testing.assert_array_equal(index.cell_events(level, int(cell)), np.sort(located[cells == cell]))
+
+
+def test_clusters_of_filtered_events(events):
+    lon, lat = events
+    index = PointIndex(lon, lat)
+    event_ids = np.arange(0, len(lon), 3)
+    clusters = index.clusters(6, event_ids)
+    located, cells = brute_force_cells(lon, lat, cluster_level(6))
+    cells = cells[np.isin(located, event_ids)]
+    expected_cells, expected_counts = np.unique(cells, return_counts=True)
+    np.testing.assert_array_equal(clusters['cells'], expected_cells)
+    np.testing.assert_array_equal(clusters['counts'], expected_counts)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import shapely
+
+import app
+from store import FloodStore
+
+
+def indexed_store(frame):
+    store = FloodStore(frame)
+    store.index_regions(app.name_resolver, app.districts_layer.geometry)
+    return store
+
+
+@pytest.fixture(scope='module')
+def stores():
+    # The inventory loaded in one go, and loaded short then brought up to date by two ingests
+    frame = app.inventory
+    full = indexed_store(frame)
+    appended = indexed_store(frame.iloc[:6000])
+    appended.append(frame.iloc[6000:6500], app.name_resolver)
+    appended.append(frame.iloc[6500:], app.name_resolver)
+    return full, appended
+
+
+@pytest.mark.parametrize('name', ['event_states', 'event_districts', 'state_events', 'district_events'])
+def test_append_matches_full_build(stores, name):
+    full, appended = stores
+    expected, actual = getattr(full, name), getattr(appended, name)
+    assert actual.n_cols == expected.n_cols
+    np.testing.assert_array_equal(actual.offsets, expected.offsets)
+    np.testing.assert_array_equal(actual.indices, expected.indices)
+
+
+def test_append_keeps_columns_and_queries(stores):
+    full, appended = stores
+    assert len(appended) == len(full)
+    assert appended.version == 2
+    np.testing.assert_array_equal(appended.start, full.start)
+    assert list(appended.frame['Main Cause']) == list(full.frame['Main Cause'])
+    assam = app.name_resolver.resolve_state('Assam')
+    np.testing.assert_array_equal(
+        appended.query('2000-01-01', None, assam), full.query('2000-01-01', None, assam))
+    ids = full.query()
+    for layer, totals in full.region_totals(ids, 'duration').items():
+        np.testing.assert_allclose(appended.region_totals(ids, 'duration')[layer], totals)
+
+
+def test_coordinates_fill_in_missing_districts_and_states():
+    # The inventory has no coordinates: place events inside known districts,
+    # then blank the district of some and the state as well of others
+    frame = app.inventory.iloc[:400].copy()
+    named = indexed_store(frame)
+    geometry = app.districts_layer.geometry
+    rng = np.random.default_rng(3)
+    targets = rng.integers(0, len(geometry), len(frame))
+    inside = shapely.point_on_surface(np.asarray(geometry)[targets])
+    frame['Longitude'], frame['Latitude'] = shapely.get_x(inside), shapely.get_y(inside)
+    no_district, no_state, no_coordinates = np.arange(0, 400, 4), np.arange(1, 400, 4), np.arange(2, 400, 8)
+    frame.iloc[np.r_[no_district, no_state], frame.columns.get_loc('Affected District')] = np.nan
+    frame.iloc[no_state, frame.columns.get_loc('Affected State')] = np.nan
+    frame.iloc[no_coordinates, frame.columns.get_loc('Affected District')] = np.nan
+    frame.iloc[no_coordinates, frame.columns.get_loc('Longitude')] = np.nan
+    store = indexed_store(frame)
+
+    district_state = np.asarray(app.name_resolver.district_state)
+    for i in no_district:
+        assert list(store.event_districts.row(i)) == [targets[i]]
+        assert list(store.event_states.row(i)) == list(named.event_states.row(i))
+    for i in no_state:
+        assert list(store.event_districts.row(i)) == [targets[i]]
+        assert list(store.event_states.row(i)) == [district_state[targets[i]]]
+    for i in no_coordinates:
+        assert not len(store.event_districts.row(i))
+    # Named districts are kept, whatever the coordinates say
+    for i in np.setdiff1d(np.arange(0, 400, 2), np.r_[no_district, no_coordinates]):
+        if len(named.event_districts.row(i)):
+            assert list(store.event_districts.row(i)) == list(named.event_districts.row(i))